@@ -0,0 +1,19 @@
+from yang_imp_fuzzer import randomstream
+
+def test_permutation_is_a_bijection():
+    for n in [1, 2, 3, 5, 16, 17, 1000, 4099]:
+        for key in [0, 1, 2 ** 64 - 1]:
+            permutation = randomstream.Permutation(key, n)
+            assert sorted(permutation.at(i) for i in range(n)) == list(range(n))
+
+def test_permutation_depends_on_key():
+    values = [randomstream.Permutation(key, 1000).at(i) for key in [1, 2] for i in range(10)]
+
+    assert values[:10] != values[10:]
+
+def test_stream_positions():
+    key = randomstream.stream_key(7, "/m:a")
+    values = [randomstream.at(key, i).getrandbits(64) for i in range(100)]
+
+    assert len(set(values)) == 100
+    assert randomstream.at(key, 42).getrandbits(64) == values[42]
@@ -0,0 +1,53 @@
+from yang_imp_fuzzer import restore
+
+LIST_KEYS = {
+    ("interfaces", "interface"): ["name"],
+    ("interfaces", "interface", "address"): None,
+}
+
+BASE = b"""<config xmlns="urn:m">
+  <interfaces>
+    <interface><name>eth0</name><mtu>1500</mtu><address>10.0.0.1</address></interface>
+  </interfaces>
+</config>"""
+
+def shape(element):
+    # local name, operation, text and children of an edit
+    children = [shape(c) for c in element]
+    return (restore.local_name(element.tag), element.get(restore.OPERATION), restore.text(element)) + tuple(children)
+
+def changes(applied):
+    res = restore.diff(restore.parse_config(BASE), restore.parse_config(applied), (), LIST_KEYS)
+    return [shape(e) for e in res]
+
+def test_unchanged():
+    assert changes(BASE) == []
+
+def test_changed_leaf():
+    applied = b"""<config xmlns="urn:m"><interfaces>
+        <interface><name>eth0</name><mtu>9000</mtu></interface>
+    </interfaces></config>"""
+
+    assert changes(applied) == [("interfaces", None, "",
+            ("interface", None, "", ("name", None, "eth0"), ("mtu", "replace", "1500")))]
+
+def test_created_entry():
+    applied = b"""<config xmlns="urn:m"><interfaces>
+        <interface><name>eth1</name><mtu>1500</mtu></interface>
+    </interfaces></config>"""
+
+    # removed by its key, the other leaves of the entry are not needed
+    assert changes(applied) == [("interfaces", None, "", ("interface", "remove", "", ("name", None, "eth1")))]
+
+def test_created_leaf_list_value():
+    applied = b"""<config xmlns="urn:m"><interfaces>
+        <interface><name>eth0</name><address>10.0.0.1</address><address>10.0.0.2</address></interface>
+    </interfaces></config>"""
+
+    assert changes(applied) == [("interfaces", None, "",
+            ("interface", None, "", ("name", None, "eth0"), ("address", "remove", "10.0.0.2")))]
+
+def test_created_container():
+    applied = b"""<config xmlns="urn:m"><system><hostname>a</hostname></system></config>"""
+
+    assert changes(applied) == [("system", "remove", "")]
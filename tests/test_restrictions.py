@@ -0,0 +1,35 @@
+import random
+from yang_imp_fuzzer import restrictions
+
+def test_parse_and_merge():
+    intervals = restrictions.IntervalSet(restrictions.parse_intervals("min..3 | 4..6 | 10 | 20..max", 0, 255), 0, 255)
+
+    assert intervals.intervals == [(0, 6), (10, 10), (20, 255)]
+    assert intervals.total == 7 + 1 + 236
+    assert (intervals.min, intervals.max) == (0, 255)
+
+def test_decimal_bounds():
+    # the bounds are rounded into the range, in units of the last fraction digit
+    assert restrictions.parse_intervals("0.05..1.25", -100, 100, 1) == [(1, 12)]
+
+def test_offsets():
+    intervals = restrictions.IntervalSet([(1, 4), (10, 10), (20, 22)])
+    values = [intervals.value_at(i) for i in range(intervals.total)]
+
+    assert values == [1, 2, 3, 4, 10, 20, 21, 22]
+    assert [intervals.offset_of(v) for v in values] == list(range(intervals.total))
+    assert [v for v in range(0, 25) if v in intervals] == values
+
+def test_random_values():
+    intervals = restrictions.IntervalSet([(1, 4), (10, 10)], 0, 255)
+    rng = random.Random(1)
+
+    assert all(intervals.uniform(rng) in intervals for _ in range(1000))
+    values = {intervals.random_value(rng) for _ in range(1000)}
+    # edges, values right outside of the intervals and nothing beyond them
+    assert values == {0, 1, 2, 3, 4, 5, 9, 10, 11}
+
+def test_outside_values_within_type():
+    intervals = restrictions.IntervalSet([(0, 255)], 0, 255)
+
+    assert intervals.outside == []
@@ -0,0 +1,44 @@
+import collections
+import pytest
+from yang_imp_fuzzer import resultlog
+
+Mutation = collections.namedtuple("Mutation", ["qualified_name", "index"])
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "cases.log")
+    paths = {"a": "/m:a/x", "b": "/m:a/y"}
+
+    log = resultlog.ResultLog(path, 2 ** 64 - 1, paths)
+    log.record(0, [Mutation("a", 3)], "ok", 0.25)
+    log.record(1, [Mutation("a", 4), Mutation("b", 1)], "invalid-value", 1.5)
+    log.close()
+
+    cases = list(resultlog.read_log(path))
+    assert [c[:5] for c in cases] == [
+        (2 ** 64 - 1, 0, "/m:a/x", 3, "ok"),
+        (2 ** 64 - 1, 1, "/m:a/x", 4, "invalid-value"),
+        (2 ** 64 - 1, 1, "/m:a/y", 1, "invalid-value"),
+    ]
+    assert [c.latency for c in cases] == pytest.approx([0.25, 1.5, 1.5])
+
+def test_appended_runs(tmp_path):
+    path = str(tmp_path / "cases.log")
+
+    for seed, reply_class in [(1, "ok"), (2, "crash")]:
+        log = resultlog.ResultLog(path, seed, {"a": "/m:a"})
+        log.record(7, [Mutation("a", 2)], reply_class, 0.0)
+        log.close()
+
+    # string ids start over with every run
+    assert [(c.seed, c.path, c.reply_class) for c in resultlog.read_log(path)] == [(1, "/m:a", "ok"), (2, "/m:a", "crash")]
+
+def test_truncated_record(tmp_path):
+    path = tmp_path / "cases.log"
+
+    log = resultlog.ResultLog(str(path), 1, {"a": "/m:a"})
+    log.record(0, [Mutation("a", 1)], "ok", 0.0)
+    log.record(1, [Mutation("a", 2)], "ok", 0.0)
+    log.close()
+    path.write_bytes(path.read_bytes()[:-3])
+
+    assert [c.index for c in resultlog.read_log(str(path))] == [0]
@@ -0,0 +1,35 @@
+from yang_imp_fuzzer import selector
+
+def walk(sel, paths):
+    state = sel.start
+    for path in paths:
+        state = sel.step(state, path)
+    return state
+
+def test_path_under_list():
+    sel = selector.Selector("/ietf-interfaces:interfaces/interface/enabled")
+    paths = [
+        "/ietf-interfaces:interfaces",
+        "/ietf-interfaces:interfaces/interface[name='%s']",
+        "/ietf-interfaces:interfaces/interface[name='%s']/enabled",
+    ]
+
+    assert walk(sel, paths[:2])
+    assert walk(sel, paths) is selector.SELECTED
+    assert walk(sel, paths[:2] + ["/ietf-interfaces:interfaces/interface[name='%s']/type"]) is None
+
+def test_list_selected():
+    sel = selector.Selector("/ietf-interfaces:interfaces/interface")
+    paths = ["/ietf-interfaces:interfaces", "/ietf-interfaces:interfaces/interface[name='%s']"]
+
+    assert walk(sel, paths) is selector.SELECTED
+
+def test_glob_under_list():
+    sel = selector.Selector("/ietf-interfaces:interfaces/*/enabled")
+    paths = [
+        "/ietf-interfaces:interfaces",
+        "/ietf-interfaces:interfaces/interface[name='%s'][type='%s']",
+        "/ietf-interfaces:interfaces/interface[name='%s'][type='%s']/enabled",
+    ]
+
+    assert walk(sel, paths) is selector.SELECTED
@@ -0,0 +1,33 @@
+import random
+from yang_imp_fuzzer import xsdregex
+
+# patterns of ietf-inet-types and ietf-yang-types
+PATTERNS = [
+    r"[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}",
+    r"(([0-1]?[0-9]?[0-9]|2[0-4][0-9]|25[0-5])\.){3}([0-1]?[0-9]?[0-9]|2[0-4][0-9]|25[0-5])(%[\p{N}\p{L}]+)?",
+    r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[\+\-]\d{2}:\d{2})",
+    r"[a-zA-Z_][a-zA-Z0-9\-_.]*",
+    r"[^:]+",
+]
+
+def test_generated_values_match():
+    rng = random.Random(1)
+    for pattern in PATTERNS:
+        compiled = xsdregex.compile_pattern(pattern)
+        for _ in range(200):
+            value = compiled.generate(rng=rng)
+            assert compiled.match(value), (pattern, value)
+
+def test_generated_values_within_lengths():
+    rng = random.Random(2)
+    compiled = xsdregex.compile_pattern(r"[a-z]+[0-9]*")
+    for _ in range(200):
+        value = compiled.generate(3, 8, rng)
+        assert compiled.match(value) and 3 <= len(value) <= 8, value
+
+def test_match_is_anchored():
+    compiled = xsdregex.compile_pattern(r"[0-9]+")
+
+    assert compiled.match("123")
+    assert not compiled.match("a123")
+    assert not compiled.match("123a")
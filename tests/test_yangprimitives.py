@@ -0,0 +1,35 @@
+from yang_imp_fuzzer import randomstream
+from yang_imp_fuzzer import yangprimitives
+
+def all_mutations(primitive):
+    return list(primitive.mutations(primitive.original_value()))
+
+def test_uint8_mutations_are_unique():
+    values = all_mutations(yangprimitives.UInt8(name="a", path="/m:a"))
+
+    # the domain and the values right outside of it, each once
+    assert len(values) == 258
+    assert set(values) == {str(v) for v in range(-1, 257)}
+
+def test_range_is_enumerated():
+    primitive = yangprimitives.UInt8(name="a", path="/m:a", ranges="1..4 | 10")
+    values = all_mutations(primitive)
+
+    assert len(values) == len(set(values)) == primitive.mutation_count()
+    assert {"1", "2", "3", "4", "10"} <= set(values)
+    assert {"0", "5", "9", "11"} <= set(values)
+    assert primitive.accepts(primitive.original_value())
+
+def test_mutation_by_index():
+    primitive = yangprimitives.Int16(name="a", path="/m:a", ranges="-100..100")
+    values = all_mutations(primitive)
+
+    assert [primitive.mutation(i) for i in range(len(values))] == values
+
+    # the order depends on the run seed, the mutations do not
+    randomstream.set_run_seed(1)
+    try:
+        other = all_mutations(primitive)
+    finally:
+        randomstream.set_run_seed(0)
+    assert other != values and sorted(other) == sorted(values)
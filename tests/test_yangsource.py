@@ -0,0 +1,95 @@
+from yang_imp_fuzzer import yangsource
+
+MODULE_A = """
+module a {
+  namespace "urn:a";
+  prefix a;
+
+  identity base1;
+  identity base2;
+  identity x1 { base base1; }
+  identity x2 { base base2; }
+
+  grouping g {
+    leaf type { type identityref { base base1; } }
+    list entry { key name; max-elements 3; leaf name { type string; } }
+  }
+
+  container one {
+    uses g;
+    choice c {
+      case k {
+        container deep {
+          leaf type { type identityref { base base2; } }
+        }
+      }
+    }
+  }
+
+  container two {
+    leaf type { type identityref { base a:base2; } }
+    list entry { key name; max-elements 7; leaf name { type string; } }
+  }
+}
+"""
+
+MODULE_B = """
+module b {
+  namespace "urn:b";
+  prefix b;
+  import a { prefix a; }
+
+  augment "/a:one/a:c/a:k/a:deep" {
+    leaf kind { type identityref { base a:base1; } }
+  }
+}
+"""
+
+class Type:
+    def __init__(self, basename):
+        self.base = basename
+
+    def basename(self):
+        return self.base
+
+    def name(self):
+        return self.base
+
+class Node:
+    def __init__(self, path):
+        self.path = path
+
+    def data_path(self):
+        return self.path
+
+    def name(self):
+        return yangsource.split_data_path(self.path)[-1][1]
+
+def source_index(tmp_path):
+    index = yangsource.SourceIndex()
+    for name, text in [("a", MODULE_A), ("b", MODULE_B)]:
+        path = tmp_path / (name + ".yang")
+        path.write_text(text)
+        index.add_file(str(path))
+    return index
+
+def test_inline_types_by_schema_path(tmp_path):
+    index = source_index(tmp_path)
+    identityref = Type("identityref")
+
+    assert index.derived_identities(Node("/a:one/type"), identityref) == [("a", "x1")]
+    assert index.derived_identities(Node("/a:one/deep/type"), identityref) == [("a", "x2")]
+    assert index.derived_identities(Node("/a:two/type"), identityref) == [("a", "x2")]
+    assert index.derived_identities(Node("/a:one/deep/b:kind"), identityref) == [("a", "x1")]
+
+def test_list_bounds_by_schema_path(tmp_path):
+    index = source_index(tmp_path)
+
+    assert index.list_bounds(Node("/a:one/entry[name='%s']")) == (0, 3)
+    assert index.list_bounds(Node("/a:two/entry[name='%s']")) == (0, 7)
+
+def test_ambiguous_name_is_not_guessed(tmp_path):
+    index = source_index(tmp_path)
+
+    # not found by its path, and "type" is the name of several statements
+    assert index.type_statement(Node("/a:three/type"), Type("identityref")) is None
@@ -21,5 +21,11 @@
 #
 
 if __name__ == "__main__":
-    from yang_imp_fuzzer.fuzzer import main
-    main()
+    import sys
+
+    if sys.argv[1:2] == ["bench"]:
+        from yang_imp_fuzzer.bench import main
+        main(sys.argv[2:], default="suite")
+    else:
+        from yang_imp_fuzzer.fuzzer import main
+        main()
@@ -0,0 +1,102 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import asyncio
+import collections
+from yang_imp_fuzzer import restore
+from yang_imp_fuzzer import template
+
+def iter_batches(node, batch_size):
+    if batch_size <= 1:
+        for mutations in node.get_mutations():
+            yield mutations
+        return
+
+    # one generator per leaf, so that a batch never holds two values for the same leaf
+    pending = collections.deque(item.get_mutations() for item in node.walk() if item.fuzzable)
+
+    while pending:
+        batch = []
+        used = []
+
+        while pending and len(batch) < batch_size:
+            generator = pending.popleft()
+            mutations = next(generator, None)
+            if mutations is None:
+                continue
+            batch.extend(mutations)
+            used.append(generator)
+
+        pending.extend(used)
+        if batch:
+            yield batch
+
+def render(node, mutations):
+    return template.get_template(node).render(mutations)
+
+def send_batch(send, node, mutations):
+    data = render(node, mutations)
+    reply = send(data)
+    yield mutations, data, reply
+
+    # bisect rejected batches until the offending values are found on their own
+    if reply[0] == "rpc-error" and len(mutations) > 1:
+        half = len(mutations) // 2
+        yield from send_batch(send, node, mutations[:half])
+        yield from send_batch(send, node, mutations[half:])
+
+async def send_batch_async(session, datastore, node, mutations, restorer=None):
+    t = template.get_template(node)
+    root = None
+    error_option = None
+    if restorer is not None:
+        # the restoring edit is computed from the whole payload, even a streamed one
+        root = restore.parse_payload(t.render(mutations))
+        error_option = restorer.error_option
+        if root is not None:
+            await restore.snapshot_async(session, restorer, root)
+
+    if t.streamed(mutations):
+        # large payloads are written to the session chunk by chunk and not kept, they
+        # are regenerated from the mutations
+        data = None
+        reply = await session.edit_config(datastore, t.render_chunks(mutations), error_option)
+    else:
+        data = t.render(mutations)
+        reply = await session.edit_config(datastore, data, error_option)
+    res = [(mutations, data, reply)]
+
+    if root is not None and reply[0] != "error" and restorer.needed(reply):
+        await restore.restore_async(session, restorer, node, root)
+
+    if reply[0] == "rpc-error" and len(mutations) > 1:
+        half = len(mutations) // 2
+        halves = [send_batch_async(session, datastore, node, mutations[:half], restorer),
+                send_batch_async(session, datastore, node, mutations[half:], restorer)]
+        if restorer is not None:
+            # each half has to find the datastore restored, so they are not sent together
+            for half in halves:
+                res.extend(await half)
+        else:
+            for part in await asyncio.gather(*halves):
+                res.extend(part)
+
+    return res
@@ -0,0 +1,398 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import argparse
+import asyncio
+import boofuzz
+import itertools
+import json
+import libyang
+import os
+import platform
+import re
+import resource
+import tempfile
+import time
+import tracemalloc
+from boofuzz.mutation_context import MutationContext
+from yang_imp_fuzzer import batch
+from yang_imp_fuzzer import fakeserver
+from yang_imp_fuzzer import fuzzer
+from yang_imp_fuzzer import randomstream
+from yang_imp_fuzzer import scheduler
+from yang_imp_fuzzer import template
+from yang_imp_fuzzer import transport
+from yang_imp_fuzzer import xsdregex
+from yang_imp_fuzzer import yangprimitives
+
+# patterns (with their length restrictions) reached from ietf-system and ietf-interfaces
+sample_patterns = {
+    "inet:ipv4-address": (r'(([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])\.){3}'
+            r'([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])'
+            r'(%[\p{N}\p{L}]+)?', 10, 256),
+    "inet:ipv6-address": (r'((:|[0-9a-fA-F]{0,4}):)([0-9a-fA-F]{0,4}:){0,5}'
+            r'((([0-9a-fA-F]{0,4}:)?(:|[0-9a-fA-F]{0,4}))|'
+            r'(((25[0-5]|2[0-4][0-9]|[01]?[0-9]?[0-9])\.){3}'
+            r'(25[0-5]|2[0-4][0-9]|[01]?[0-9]?[0-9])))'
+            r'(%[\p{N}\p{L}]+)?', 10, 256),
+    "inet:domain-name": (r'((([a-zA-Z0-9_]([a-zA-Z0-9\-_]){0,61})?[a-zA-Z0-9]\.)*'
+            r'([a-zA-Z0-9_]([a-zA-Z0-9\-_]){0,61})?[a-zA-Z0-9]\.?)'
+            r'|\.', 1, 253),
+    "ianach:crypt-hash": (r'$0$.*'
+            r'|$1$[a-zA-Z0-9./]{1,8}$[a-zA-Z0-9./]{22}'
+            r'|$5$(rounds=\d+$)?[a-zA-Z0-9./]{1,16}$[a-zA-Z0-9./]{43}'
+            r'|$6$(rounds=\d+$)?[a-zA-Z0-9./]{1,16}$[a-zA-Z0-9./]{86}', 10, 256),
+    "yang:phys-address": (r'([0-9a-fA-F]{2}(:[0-9a-fA-F]{2})*)?', 10, 256),
+    "yang:mac-address": (r'[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}', 10, 256),
+    "yang:date-and-time": (r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?'
+            r'(Z|[\+\-]\d{2}:\d{2})', 10, 256),
+}
+
+# the rstr.xeger rejection loop String used before, bounded since some patterns never satisfy it
+def legacy_generate(pattern, min_val, max_val, attempts=10000):
+    import rstr
+
+    pattern = pattern.replace("\\p{L}", "[a-zA-z]")
+    pattern = pattern.replace("\\p{N}", "\\d")
+    for _ in range(attempts):
+        value = rstr.xeger(pattern)
+        if min_val <= len(value) <= max_val and re.match(pattern, value):
+            return value
+    return None
+
+def compiled_generate(pattern, min_val, max_val):
+    return xsdregex.compile_pattern(pattern).generate(min_val, max_val)
+
+def values_per_second(generate, pattern, min_val, max_val, duration):
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+
+    while time.perf_counter() < end:
+        generate(pattern, min_val, max_val)
+        count += 1
+
+    return count / (time.perf_counter() - start)
+
+def bench_patterns(duration, legacy):
+    results = {}
+
+    for name, (pattern, min_val, max_val) in sample_patterns.items():
+        results[name] = {"compiled": values_per_second(compiled_generate, pattern, min_val, max_val, duration)}
+        if legacy:
+            results[name]["legacy"] = values_per_second(legacy_generate, pattern, min_val, max_val, duration)
+
+    return results
+
+sample_config = (b'<nc:config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+        b'<system xmlns="urn:ietf:params:xml:ns:yang:ietf-system"><hostname>bench</hostname></system></nc:config>')
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def measure_transport(window, rpcs, latency, service_time):
+    server = fakeserver.FakeServer(latency, service_time)
+    tcp_server = await server.start("127.0.0.1", 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    session = await transport.connect_tcp("127.0.0.1", port)
+
+    in_flight = asyncio.Semaphore(window)
+    latencies = []
+
+    async def send():
+        async with in_flight:
+            start = time.perf_counter()
+            await session.edit_config("running", sample_config)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[send() for _ in range(rpcs)])
+    elapsed = time.perf_counter() - start
+
+    await session.close()
+    tcp_server.close()
+    await tcp_server.wait_closed()
+
+    return {"rpcs/s": rpcs / elapsed, "p50 ms": percentile(latencies, 0.5) * 1000, "p99 ms": percentile(latencies, 0.99) * 1000}
+
+def bench_transport(windows, rpcs, latency, service_time):
+    results = {}
+    loop = asyncio.new_event_loop()
+
+    for window in windows:
+        results[window] = loop.run_until_complete(measure_transport(window, rpcs, latency, service_time))
+
+    loop.close()
+    return results
+
+# a top-level container with the given number of alternating uint32 and string leaves
+def sample_request(leaves):
+    children = [boofuzz.Static(default_value="""<nc:config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">"""),
+            boofuzz.Static(default_value="<bench xmlns=\"urn:bench\">")]
+
+    for i in range(leaves):
+        name = "leaf" + str(i)
+        children.append(boofuzz.Static(name=name + "start", default_value="<" + name + ">"))
+        if i % 2:
+            children.append(yangprimitives.String(name=name + "data", min_val=1, max_val=32, path="/bench:bench/" + name))
+        else:
+            children.append(yangprimitives.UInt32(name=name + "data", path="/bench:bench/" + name))
+        children.append(boofuzz.Static(name=name + "end", default_value="</" + name + ">"))
+
+    children.append(boofuzz.Static(default_value="</bench>"))
+    children.append(boofuzz.Static(default_value="</nc:config>"))
+    return boofuzz.Request("bench", children=children)
+
+def boofuzz_render(node, mutations):
+    return node.render(MutationContext(mutations=mutations, message_path=[node]))
+
+def cases_per_second(render, node, cases, duration):
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+
+    for mutations in itertools.cycle(cases):
+        render(node, mutations)
+        count += 1
+        if count % 100 == 0 and time.perf_counter() >= end:
+            break
+
+    return count / (time.perf_counter() - start)
+
+def bench_render(sizes, duration):
+    results = {}
+
+    for leaves in sizes:
+        node = sample_request(leaves)
+        cases = [mutations for _, _, mutations in itertools.islice(scheduler.iter_cases([node]), 1000)]
+        template.get_template(node)
+        results[leaves] = {
+            "boofuzz": cases_per_second(boofuzz_render, node, cases, duration),
+            "template": cases_per_second(batch.render, node, cases, duration),
+        }
+
+    return results
+
+# abridged copies of the modules, so the suite runs without any modules installed
+bench_modules_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmodules")
+sample_modules = ["ietf-system", "ietf-interfaces", "synthetic"]
+synthetic_name = "yang-imp-fuzzer-bench"
+
+synthetic_container = """
+  container c{index} {{
+    leaf flag {{ type boolean; }}
+    leaf count {{ type uint32 {{ range "1..1000 | 2000..max"; }} }}
+    leaf offset {{ type int64; }}
+    leaf level {{ type int8 {{ range "-10..10"; }} }}
+    leaf small {{ type uint16; }}
+    leaf delta {{ type int16; }}
+    leaf total {{ type int32; }}
+    leaf size {{ type uint64; }}
+    leaf ratio {{ type percent; }}
+    leaf label {{ type string {{ length "1..64"; pattern '[a-z][a-z0-9\\-]*'; }} }}
+    leaf address {{ type ipv4-address; }}
+    leaf rate {{ type decimal64 {{ fraction-digits 3; range "0 .. 1000"; }} }}
+    leaf mode {{ type enumeration {{ enum auto; enum manual; enum off; }} }}
+    leaf options {{ type bits {{ bit fast; bit safe; bit quiet; }} }}
+    leaf blob {{ type binary {{ length "0..64"; }} }}
+    leaf kind {{ type identityref {{ base kind; }} }}
+    leaf target {{ type leafref {{ path "../entry/name"; }} }}
+    leaf value {{ type union {{ type uint16; type string {{ length "1..8"; }} }} }}
+    leaf enabled {{ type empty; }}
+    leaf ref {{ type instance-identifier; }}
+    list entry {{
+      key name;
+      max-elements 64;
+      leaf name {{ type string {{ length "1..32"; }} }}
+      leaf weight {{ type uint8; mandatory true; }}
+    }}
+  }}
+"""
+
+def synthetic_module(containers):
+    # every built-in type in every container, to measure a large model without installing one
+    res = ["module " + synthetic_name + " {",
+            '  namespace "urn:yang-imp-fuzzer:bench";',
+            "  prefix bench;",
+            "  identity kind;"]
+    res.extend("  identity kind{} {{ base kind; }}".format(i) for i in range(8))
+    res.append('  typedef percent { type uint8 { range "0..100"; } }')
+    res.append("  typedef ipv4-address { type string { pattern "
+            "'(([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])\\.){3}"
+            "([0-9]|[1-9][0-9]|1[0-9][0-9]|2[0-4][0-9]|25[0-5])'; } }")
+    res.extend(synthetic_container.format(index=i) for i in range(containers))
+    res.append("}")
+    return "\n".join(res) + "\n"
+
+def load_module(modules_dir, name):
+    # all features of the module are enabled, there is no server to ask
+    ctx = libyang.Context(modules_dir)
+    module = ctx.load_module(name)
+    features = [f.name() for f in module.features()]
+    return ctx, fuzzer.ModuleParser(modules_dir, name, None, [], None, None, features, ctx)
+
+def measure_module(modules_dir, name):
+    start = time.perf_counter()
+    ctx, parser = load_module(modules_dir, name)
+    loaded = time.perf_counter()
+    nodes = parser.parse_module()
+    parsed = time.perf_counter()
+
+    # tracing slows the parser down, so the memory is measured in a second pass
+    del ctx, parser
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ctx, parser = load_module(modules_dir, name)
+    traced = parser.parse_module()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    leaves = sum(1 for node in nodes for item in node.walk() if item.fuzzable)
+    result = {
+        "load s": loaded - start,
+        "parse s": parsed - loaded,
+        "requests": len(nodes),
+        "leaves": leaves,
+        "tree MiB": (current - before) / 2 ** 20,
+        "peak MiB": (peak - before) / 2 ** 20,
+    }
+    return result, nodes
+
+def mutations_per_second(items, duration):
+    values = itertools.chain.from_iterable(item.mutations(item.original_value()) for item in itertools.cycle(items))
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+
+    for _ in values:
+        count += 1
+        if count % 100 == 0 and time.perf_counter() >= end:
+            break
+
+    return count / (time.perf_counter() - start)
+
+def bench_primitives(nodes, duration):
+    items = {}
+    for node in nodes:
+        for item in node.walk():
+            if item.fuzzable:
+                items.setdefault(type(item).__name__, []).append(item)
+
+    return {name: mutations_per_second(items[name], duration) for name in sorted(items)}
+
+def bench_cases(nodes, duration, limit=1000):
+    # the same number of cases from every request, so the rate is not just the one of the first request
+    per_node = max(1, limit // max(1, len(nodes)))
+    cases = [(node, mutations) for node in nodes for mutations in itertools.islice(batch.iter_batches(node, 1), per_node)]
+    if not cases:
+        return 0.0
+
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+
+    for node, mutations in itertools.cycle(cases):
+        batch.render(node, mutations)
+        count += 1
+        if count % 100 == 0 and time.perf_counter() >= end:
+            break
+
+    return count / (time.perf_counter() - start)
+
+def bench_suite(names, modules_dir, containers, duration):
+    results = {}
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        with open(os.path.join(synthetic_dir, synthetic_name + ".yang"), "w") as f:
+            f.write(synthetic_module(containers))
+
+        for name in names:
+            if name == "synthetic":
+                result, nodes = measure_module(synthetic_dir, synthetic_name)
+                result["containers"] = containers
+            else:
+                result, nodes = measure_module(modules_dir, name)
+
+            result["mutations/s"] = bench_primitives(nodes, duration)
+            result["cases/s"] = bench_cases(nodes, duration)
+            results[name] = result
+
+    return {
+        "python": platform.python_version(),
+        "seed": randomstream.run_seed,
+        "duration": duration,
+        "modules": results,
+        # includes the memory libyang allocates outside of the Python heap
+        "max rss MiB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def parse_args(argv=None, default='patterns'):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the YANG fuzzer value generators and transports")
+    parser.add_argument('benchmark', nargs='?', choices=['patterns', 'transport', 'render', 'suite'], default=default, help='Benchmark to run, suite measures the parsing, value generation and rendering of whole modules and prints JSON')
+    parser.add_argument('--duration', dest='duration', type=float, default=1.0, help='Seconds to spend on every measurement')
+    parser.add_argument('--legacy', dest='legacy', action='store_true', help='Also measure the rstr.xeger rejection loop (requires rstr)')
+    parser.add_argument('--sizes', dest='sizes', type=str, default='10,100,1000', help='Comma separated numbers of leaves of the requests rendered by the render benchmark')
+    parser.add_argument('--windows', dest='windows', type=str, default='1,2,4,8,16,32', help='Comma separated numbers of RPCs in flight to measure the transport with')
+    parser.add_argument('--rpcs', dest='rpcs', type=int, default=2000, help='Number of RPCs sent for every transport measurement')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.002, help='Round trip time of the fake NETCONF server in seconds')
+    parser.add_argument('--service-time', dest='service_time', type=float, default=0.0, help='Serialized processing time of the fake NETCONF server in seconds')
+    parser.add_argument('--modules', dest='modules', type=str, nargs='+', default=sample_modules, help='Modules measured by the suite, synthetic is a generated module with every built-in type')
+    parser.add_argument('--modules-directory', dest='modules_dir', type=str, default=bench_modules_dir, help='Directory with the modules measured by the suite, by default the bundled copies of ietf-system and ietf-interfaces')
+    parser.add_argument('--containers', dest='containers', type=int, default=500, help='Number of containers of the synthetic module')
+    parser.add_argument('--seed', dest='seed', type=int, default=0, help='Seed of the generated values')
+    parser.add_argument('--output', dest='output', type=str, help='Path of a JSON file to write the suite results to, instead of printing them')
+    return parser.parse_args(argv)
+
+def main(argv=None, default='patterns'):
+    args = parse_args(argv, default)
+    randomstream.set_run_seed(args.seed)
+
+    if args.benchmark == "suite":
+        results = bench_suite(args.modules, args.modules_dir, args.containers, args.duration)
+        if args.output is None:
+            print(json.dumps(results, indent=2))
+        else:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return
+
+    if args.benchmark == "transport":
+        windows = [int(w) for w in args.windows.split(",")]
+        for window, result in bench_transport(windows, args.rpcs, args.latency, args.service_time).items():
+            print("{:>3} in flight {:>10.0f} rpcs/s  p50 {:.2f} ms  p99 {:.2f} ms".format(window, result["rpcs/s"], result["p50 ms"], result["p99 ms"]))
+        return
+
+    if args.benchmark == "render":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        for leaves, rates in bench_render(sizes, args.duration).items():
+            print("{:>5} leaves {:>10.0f} cases/s (boofuzz render {:.0f} cases/s)".format(leaves, rates["template"], rates["boofuzz"]))
+        return
+
+    for name, rates in bench_patterns(args.duration, args.legacy).items():
+        line = "{:<20} {:>12.0f} values/s".format(name, rates["compiled"])
+        if "legacy" in rates:
+            line += " (legacy {:.0f} values/s)".format(rates["legacy"])
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import hashlib
+
+MASK = 2 ** 64 - 1
+
+# A Bloom filter over a fixed number of bytes. A false positive skips a value that was
+# not sent yet, with 4 hashes and 8 MiB that stays below one in 10000 for a million values.
+class BloomFilter:
+    hashes = 4
+
+    def __init__(self, size):
+        self.bits = bytearray(size)
+        self.size = size * 8
+
+    def add(self, data):
+        # returns whether data was not in the filter before
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        new = False
+
+        for i in range(self.hashes):
+            bit = ((h1 + i * h2) & MASK) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+
+        return new
+
+def fingerprint(mutation):
+    value = mutation.value
+    if not isinstance(value, bytes):
+        value = str(value).encode()
+    return mutation.qualified_name.encode() + b"\0" + value
+
+# Wraps a scheduler and drops the mutations whose value was already sent for the same
+# leaf, so that a case is only sent if at least one of its values is new. The filter is
+# kept per worker, the workers send disjoint mutations of a leaf anyway.
+class Deduplicator:
+    def __init__(self, scheduler, size):
+        self.scheduler = scheduler
+        self.seen = BloomFilter(size)
+        self.hits = 0
+
+    def cases(self):
+        for index, node, mutations in self.scheduler.cases():
+            fresh = [m for m in mutations if self.seen.add(fingerprint(m))]
+            self.hits += len(mutations) - len(fresh)
+            if fresh:
+                yield index, node, fresh
+
+    def record(self, mutations, reply_class):
+        self.scheduler.record(mutations, reply_class)
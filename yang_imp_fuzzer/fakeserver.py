@@ -0,0 +1,132 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import argparse
+import asyncio
+import random
+from yang_imp_fuzzer import transport
+
+# A stand-in NETCONF server over plain TCP. It answers every rpc with <ok/>, or with an
+# <rpc-error> for a share of them, after a configurable network latency and a
+# serialized per-rpc service time, which is enough to benchmark the transports offline.
+class FakeServer:
+    def __init__(self, latency=0.0, service_time=0.0, reject_ratio=0.0, seed=None):
+        self.latency = latency
+        self.service_time = service_time
+        self.reject_ratio = reject_ratio
+        self.random = random.Random(seed)
+        self.lock = asyncio.Lock()
+        self.session_id = 0
+        self.rpcs = 0
+
+    def hello(self):
+        self.session_id += 1
+        return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+                "<hello xmlns=\"" + transport.BASE_NS + "\"><capabilities>"
+                "<capability>" + transport.BASE_1_0 + "</capability>"
+                "<capability>" + transport.BASE_1_1 + "</capability>"
+                "</capabilities><session-id>" + str(self.session_id) + "</session-id></hello>").encode()
+
+    def reply(self, message_id, request):
+        body = b"<ok/>"
+        if b"<close-session" not in request and self.random.random() < self.reject_ratio:
+            body = (b"<rpc-error><error-type>application</error-type><error-tag>invalid-value</error-tag>"
+                    b"<error-severity>error</error-severity><error-message>rejected by fake server</error-message></rpc-error>")
+
+        return (b"<rpc-reply message-id=\"" + message_id + b"\" xmlns=\"" + transport.BASE_NS.encode() + b"\">"
+                + body + b"</rpc-reply>")
+
+    async def process(self, message_id, request):
+        await asyncio.sleep(self.latency / 2)
+        if self.service_time:
+            async with self.lock:
+                await asyncio.sleep(self.service_time)
+        await asyncio.sleep(self.latency / 2)
+        self.rpcs += 1
+        return self.reply(message_id, request)
+
+    async def write_replies(self, writer, replies, chunked):
+        # replies go out in request order, like a real server
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                break
+            writer.write(transport.frame(await reply, chunked))
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        writer.write(transport.frame(self.hello(), False))
+
+        try:
+            client_hello = await transport.read_message(reader, False)
+        except transport.TransportClosed:
+            writer.close()
+            return
+
+        chunked = transport.BASE_1_1 in transport.parse_capabilities(client_hello)
+        replies = asyncio.Queue()
+        writer_task = asyncio.ensure_future(self.write_replies(writer, replies, chunked))
+
+        try:
+            while True:
+                request = await transport.read_message(reader, chunked)
+                match = transport.message_id_re.search(request, 0, 512)
+                message_id = match.group(1) if match else b""
+                replies.put_nowait(asyncio.ensure_future(self.process(message_id, request)))
+                if b"<close-session" in request:
+                    break
+        except transport.TransportClosed:
+            pass
+
+        replies.put_nowait(None)
+        await writer_task
+        writer.close()
+
+    async def start(self, host, port):
+        return await asyncio.start_server(self.handle, host, port, limit=transport.stream_limit)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local stand-in NETCONF server over TCP for offline benchmarks")
+    parser.add_argument('--ip', dest='ip', type=str, default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', dest='port', type=int, default=8830, help='TCP port to listen on')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.001, help='Round trip time added to every rpc in seconds')
+    parser.add_argument('--service-time', dest='service_time', type=float, default=0.0, help='Serialized processing time of every rpc in seconds')
+    parser.add_argument('--reject-ratio', dest='reject_ratio', type=float, default=0.0, help='Share of rpcs answered with an rpc-error')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    server = FakeServer(args.latency, args.service_time, args.reject_ratio)
+
+    loop = asyncio.get_event_loop()
+    tcp_server = loop.run_until_complete(server.start(args.ip, args.port))
+    print("fake NETCONF server listening on {}:{}".format(args.ip, args.port))
+
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+    tcp_server.close()
+    loop.run_until_complete(tcp_server.wait_closed())
+
+if __name__ == "__main__":
+    main()
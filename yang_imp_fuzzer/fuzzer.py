@@ -22,23 +22,87 @@
 
 import argparse
 import boofuzz
+import collections
 import libyang
-import xmltodict
+import random
+import re
 import sys
-import yang_imp_fuzzer.yangprimitives
+from yang_imp_fuzzer import load
+from yang_imp_fuzzer import minimize
+from yang_imp_fuzzer import oracle
+from yang_imp_fuzzer import randomstream
+from yang_imp_fuzzer import selector
+from yang_imp_fuzzer import transport
+from yang_imp_fuzzer import treecache
+from yang_imp_fuzzer import workers
+from yang_imp_fuzzer import yanglibrary
+from yang_imp_fuzzer import yangprimitives
+from yang_imp_fuzzer import yangsource
+
+namespace_re = re.compile(r'^\s*namespace\s+["\']?([^"\';\s]+)', re.MULTILINE)
+key_predicate_re = re.compile(r"\[([\w.\-]+)=")
+fraction_re = re.compile(r"\.(\d+)")
+
+def element_path(path):
+    # the element names of a data path, without predicates and module prefixes
+    path = yangsource.predicate_re.sub("", path)
+    return tuple(segment.split(":")[-1] for segment in path.strip("/").split("/"))
+
+def parse_yang_version(text):
+    for line in text.splitlines():
+        elements = line.strip().split()
+        if len(elements) == 2 and elements[0] == "yang-version":
+            if elements[1].strip('";') == "1.1":
+                return "1.1"
+    return "1.0"
+
+def parse_namespace(text):
+    match = namespace_re.search(text)
+    return match.group(1) if match else None
+
+def get_enabled_features(module_name, index, version):
+    features = index.module_features(module_name, version)
+
+    if features is None:
+        if version == "1.1":
+            sys.exit("module not found on remote server")
+        return []
+
+    return features
 
 class ModuleParser:
-    def __init__(self, modules_dir, module_path, namespace, capabilities, conn, fuzz_xpath):
+    def __init__(self, modules_dir, module_path, namespace, capabilities, conn, fuzz_xpath, enabled_features=None, ctx=None, index=None, max_list_entries=4096):
         self.module_path = module_path
-        self.namespace = namespace
+        self.max_list_entries = max_list_entries
         self.conn = conn
         self.fuzz_xpath = fuzz_xpath
-
-        self.ctx = libyang.Context(modules_dir)
+        self.selector = None
+        if fuzz_xpath:
+            self.selector = selector.Selector(fuzz_xpath)
+
+        # modules parsed in the same run can share one context, so common imports are loaded once
+        self.ctx = ctx
+        if ctx is None:
+            self.ctx = libyang.Context(modules_dir)
         self.module = self.ctx.load_module(module_path)
-        self.version = self.parse_yang_version(self.module.filepath())
+        self.sources = yangsource.get_index(self.ctx)
+        self.leafref_targets = {}
+        self.instance_paths = None
+        self.list_keys = {}
+
+        with open(self.module.filepath()) as f:
+            text = f.read()
+        self.version = parse_yang_version(text)
+
+        self.namespace = namespace
+        if namespace is None:
+            self.namespace = parse_namespace(text)
 
-        self.enabled_features = self.get_enabled_features(capabilities, self.version)
+        self.enabled_features = enabled_features
+        if enabled_features is None:
+            if index is None:
+                index = yanglibrary.FeatureIndex(capabilities, conn)
+            self.enabled_features = get_enabled_features(self.module.name(), index, self.version)
 
         self.enable_local_features()
 
@@ -50,199 +114,450 @@ class ModuleParser:
             if f in module_features:
                 self.module.feature_enable(f)
 
-    def parse_yang_version(self, filepath):
-        with open(filepath)as f:
-            for line in f:
-                statement = line.strip()
-                elements = statement.split()
-                if len(elements) == 2 and elements[0] == "yang-version":
-                    if elements[1] == "1.1;":
-                        return "1.1"
-        return "1.0"
-
-    def get_enabled_features(self, capabilities, version):
-        if version == "1.0":
-            for c in capabilities:
-                if "?module=" + self.module.name() + "&" in c:
-                    return self.parse_features(c)
-        elif version == "1.1":
-            namespace = {"ly": "urn:ietf:params:xml:ns:yang:ietf-yang-library"}
-            select = "/ly:yang-library"
-            xml = self.conn.get(filter=("xpath", (namespace, select))).data_xml
-            modules = xmltodict.parse(xml)['data']['yang-library']['module-set']['module']
-            if self.module.name() not in [m['name'] for m in modules]:
-                sys.exit("module not found on remote server")
-            for m in modules:
-                if m['name'] == self.module.name():
-                    if isinstance(m['feature'], str):
-                        return [m['feature']]
-                    else:
-                        return m['feature']
-
-        return []
-
-    def parse_features(self, capability):
-        features = capability.split("&features=")
-
-        if len(features) < 2:
-            return []
-
-        features = features[1]
-
-        return features.split(",")
-
     def parse_module(self):
-        nodes = []
+        return list(self.iter_module())
+
+    def iter_module(self):
         for c in self.module.children():
             if not c.config_false():
                 node = self.parse_top_level_node(c)
                 if node is not None:
-                    nodes.append(node)
+                    yield node
 
-        return nodes
+    def select(self, path, state):
+        if self.selector is None:
+            return selector.SELECTED
+        return self.selector.step(state, path)
 
     def parse_top_level_node(self, node):
         config_start = boofuzz.Static(default_value="""<nc:config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">""")
         config_end = boofuzz.Static(default_value="</nc:config>")
         res = [] 
 
-        if self.fuzz_xpath is not None and node.data_path() not in self.fuzz_xpath:
+        path = node.data_path()
+        state = self.select(path, self.selector.start if self.selector is not None else None)
+        if state is None:
             return None
+        self.list_keys = {}
 
         if node.keyword() in ['container', 'list', 'rpc']:
+            data = self.parse_container_node(node, True, path, state)
+            if not data:
+                return None
             res.append(config_start)
-            res.extend(self.parse_container_node(node, True))
+            res.extend(data)
         else:
-            res.extend(self.parse_data_node(node))
+            data = self.parse_data_node(node, path, state)
+            if not data:
+                return None
+            res.extend(data)
 
         res.append(config_end)
         node = boofuzz.Request(node.name(), children=res)
+        # identifies the list entries in the payload when the datastore is restored
+        node.list_keys = self.list_keys
         return node
 
-    def parse_nested_node(self, node):
-        config_start = boofuzz.Static(default_value="""<nc:config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">""")
-        config_end = boofuzz.Static(default_value="</nc:config>")
+    def parse_nested_node(self, node, parent_state):
         res = [] 
 
-        if self.fuzz_xpath is not None and node.data_path() not in self.fuzz_xpath:
+        path = node.data_path()
+        state = self.select(path, parent_state)
+        if state is None:
             return res
 
         if node.keyword() in ['container', 'list', 'rpc']:
-            res.extend(self.parse_container_node(node, False))
+            res.extend(self.parse_container_node(node, False, path, state))
         else:
-            res.extend(self.parse_data_node(node))
+            res.extend(self.parse_data_node(node, path, state))
 
         return res
 
-    def parse_container_node(self, node, namespace):
+    def parse_container_node(self, node, namespace, path, state):
         res = []
 
-        if self.fuzz_xpath is not None and node.data_path() not in self.fuzz_xpath:
-            return res
-
         if namespace:
             res.append(boofuzz.Static(default_value="<" + node.name() + " xmlns=\"" + self.namespace + "\">"))
         else:
             res.append(boofuzz.Static(default_value="<" + node.name() + ">"))
 
+        if node.keyword() == "list":
+            self.list_keys[element_path(path)] = tuple(k.name() for k in node.keys())
+
+        keys = {}
+        body = []
         for c in node.children():
             if c.config_false():
                 continue
-            res.extend(self.parse_nested_node(c))
+            data = self.parse_nested_node(c, state)
+            res.extend(data)
+
+            if node.keyword() == "list" and c.keyword() == "leaf" and len(data) == 3:
+                if c.is_key():
+                    keys[c.name()] = (data[0].render(), data[1], data[2].render())
+                elif c.mandatory():
+                    body.extend(item.render() for item in data)
+
+        # a container that is only on the way to a selection is dropped if nothing below it was selected
+        if state is not selector.SELECTED and len(res) == 1:
+            return []
+
+        end = boofuzz.Static(default_value="</" + node.name() + ">")
+        res.append(end)
 
-        res.append(boofuzz.Static(default_value="</" + node.name() + ">"))
+        if node.keyword() == "list" and state is selector.SELECTED and keys and self.max_list_entries > 1:
+            entries = self.handle_list_entries(node, keys, b"".join(body), res[0].render(), end.render(), path)
+            if entries is not None:
+                res.append(entries)
 
         return res
 
-    def parse_data_node(self, node):
+    def handle_list_entries(self, node, keys, body, start, end, path=None):
+        # the keys are in the order of the key statement, which is the order they are encoded in
+        names = [k.name() for k in node.keys()]
+        if any(name not in keys for name in names):
+            return None
+        min_elements, max_elements = self.sources.list_bounds(node)
+
+        return yangprimitives.ListEntries(name=node.name() + "entries", start=start, end=end,
+                keys=[keys[name] for name in names], body=body, min_elements=min_elements, max_elements=max_elements,
+                max_entries=self.max_list_entries, path=(path or node.data_path()) + "#entries")
+
+    def parse_data_node(self, node, path, state):
         res = []
 
-        if self.fuzz_xpath is not None and node.data_path() not in self.fuzz_xpath:
+        if state is not selector.SELECTED:
             return res
 
-        res.append(boofuzz.Static(name=node.name() + "start", default_value="<" + node.name() + ">"))
-        res.append(self.handle_data_node_type(node))
+        if node.keyword() == "leaf-list":
+            # leaf-list entries are identified by their value
+            self.list_keys[element_path(path)] = None
+
+        data = self.handle_data_node_type(node, path)
+        # prefixes used in identityref and instance-identifier values
+        xmlns = "".join(' xmlns:{}="{}"'.format(prefix, namespace)
+                for prefix, namespace in sorted(getattr(data, "namespaces", {}).items()))
+
+        res.append(boofuzz.Static(name=node.name() + "start", default_value="<" + node.name() + xmlns + ">"))
+        res.append(data)
 
         res.append(boofuzz.Static(name=node.name() + "end", default_value="</" + node.name() + ">"))
 
         return res
 
-    def handle_data_node_type(self, node):
-        node_type = node.type()
-
-        if node_type.base() == libyang.Type.UNION:
-            return self.handle_union_node(node_type, node.name())
-        elif node_type.base() == libyang.Type.ENUM:
-            return self.handle_enum_node(node_type, node.name())
+    def handle_data_node_type(self, node, path=None):
+        return self.handle_type(node, node.type(), node.name(), path)
+
+    def handle_type(self, node, node_type, name, path=None):
+        # typedefs are resolved by libyang, a derived type only shows up before that
+        while node_type.base() == libyang.Type.DER and node_type.derived_type() is not None:
+            node_type = node_type.derived_type()
+
+        base = node_type.base()
+        if base == libyang.Type.UNION:
+            return self.handle_union_node(node, node_type, name, path)
+        elif base == libyang.Type.ENUM:
+            return self.handle_enum_node(node_type, name, path)
+        elif base == libyang.Type.BITS:
+            return self.handle_bits_node(node_type, name, path)
+        elif base == libyang.Type.DEC64:
+            return self.handle_decimal64_node(node, node_type, name, path)
+        elif base == libyang.Type.IDENT:
+            return self.handle_identityref_node(node, node_type, name, path)
+        elif base == libyang.Type.INST:
+            return self.handle_instance_identifier_node(name, path)
+        elif base == libyang.Type.LEAFREF:
+            return self.handle_leafref_node(node, node_type, name, path)
         else:
-            return self.handle_primitive_node(node_type, node.name())
+            return self.handle_primitive_node(node_type, name, path)
 
-    def handle_primitive_node(self, node, name):
-        max_val, min_val, patterns = self.handle_data_restriction_stmts(node)
+    def handle_primitive_node(self, node, name, path=None):
+        lengths, ranges, patterns = self.handle_data_restriction_stmts(node)
+        primitive = yangprimitives.yang_boofuzz_map[node.base()]
+        kwargs = {}
 
-        if min_val and max_val:
-            if patterns:
-                return yangprimitives.yang_boofuzz_map[node.base()](name=name + "data", min_val=min_val, max_val=max_val, patterns=patterns)
-            else:
-                return yangprimitives.yang_boofuzz_map[node.base()](name=name+ "data", min_val=min_val, max_val=max_val)
-        else:
-            if patterns:
-                return yangprimitives.yang_boofuzz_map[node.base()](name=name + "data", patterns=patterns)
-            else:
-                return yangprimitives.yang_boofuzz_map[node.base()](name=name + "data")
+        if lengths is not None:
+            kwargs["lengths"] = lengths
+        if ranges is not None:
+            kwargs["ranges"] = ranges
+        if patterns:
+            kwargs["patterns"] = patterns
+        if issubclass(primitive, yangprimitives.Primitive):
+            kwargs["path"] = path
 
-    def handle_enum_node(self, node, name):
-        enum_vals = [e[0] for e in node.all_enums()]
-        return yangprimitives.yang_boofuzz_map[libyang.Type.ENUM](name=name + "data", enum_vals=enum_vals)
+        return primitive(name=name + "data", **kwargs)
 
-    def handle_union_node(self, node, name):
-        children = [self.handle_primitive_node(n, name + "child" + str(i)) for i, n in enumerate(node.union_types())]
-        return yangprimitives.yang_boofuzz_map[libyang.Type.UNION](name=name + "data", children=children)
+    def handle_enum_node(self, node, name, path=None):
+        enum_vals = [e[0] for e in node.all_enums()]
+        return yangprimitives.yang_boofuzz_map[libyang.Type.ENUM](name=name + "data", enum_vals=enum_vals, path=path)
+
+    def handle_bits_node(self, node, name, path=None):
+        bit_names = [b[0] for b in node.all_bits()]
+        return yangprimitives.yang_boofuzz_map[libyang.Type.BITS](name=name + "data", bit_names=bit_names, path=path)
+
+    def handle_decimal64_node(self, leaf, node, name, path=None):
+        _, ranges, _ = self.handle_data_restriction_stmts(node)
+        fraction_digits = self.sources.fraction_digits(leaf, node)
+        if fraction_digits is None:
+            # the number of digits in the range is the best guess without the source
+            fraction_digits = max([len(d) for d in fraction_re.findall(ranges or "")] + [1])
+
+        return yangprimitives.yang_boofuzz_map[libyang.Type.DEC64](name=name + "data", fraction_digits=fraction_digits,
+                ranges=ranges, path=path)
+
+    def handle_identityref_node(self, leaf, node, name, path=None):
+        identities = self.sources.derived_identities(leaf, node)
+        enum_vals = ["{}:{}".format(module, identity) for module, identity in identities]
+        namespaces = {module: self.sources.namespaces[module] for module, _ in identities if self.sources.namespaces.get(module)}
+
+        return yangprimitives.yang_boofuzz_map[libyang.Type.IDENT](name=name + "data", enum_vals=enum_vals or [""],
+                namespaces=namespaces, path=path)
+
+    def handle_instance_identifier_node(self, name, path=None):
+        if self.instance_paths is None:
+            self.instance_paths = self.collect_instance_paths()
+
+        enum_vals, modules = self.instance_paths
+        namespaces = {module: self.sources.namespaces[module] for module in modules if self.sources.namespaces.get(module)}
+
+        return yangprimitives.yang_boofuzz_map[libyang.Type.INST](name=name + "data", enum_vals=enum_vals or ["/"],
+                namespaces=namespaces, path=path)
+
+    def collect_instance_paths(self):
+        # instance-identifiers of the configuration nodes of the module, with a module
+        # name prefix on every segment and key values left as %s
+        paths = []
+        modules = set()
+        pending = [c for c in self.module.children() if not c.config_false()]
+
+        while pending:
+            node = pending.pop(0)
+            if node.keyword() in ["container", "list", "leaf", "leaf-list"]:
+                segments = []
+                module = None
+                for segment in node.data_path().strip("/").split("/"):
+                    name, _, predicates = segment.partition("[")
+                    if ":" in name:
+                        module, name = name.split(":", 1)
+                    modules.add(module)
+                    predicates = key_predicate_re.sub(r"[{}:\1=".format(module), "[" + predicates) if predicates else ""
+                    segments.append("{}:{}{}".format(module, name, predicates))
+                paths.append("/" + "/".join(segments))
+
+            if node.keyword() in ["container", "list", "choice", "case"]:
+                pending.extend(c for c in node.children() if not c.config_false())
+
+        return paths, modules
+
+    def handle_leafref_node(self, leaf, node, name, path=None):
+        target = None
+        target_path = self.sources.leafref_path(leaf, node)
+
+        if target_path is not None:
+            target = self.leafref_targets.get(target_path)
+            if target is None:
+                try:
+                    target_node = next(self.ctx.find_path(target_path), None)
+                except libyang.LibyangError:
+                    target_node = None
+                if target_node is not None and target_node.keyword() in ["leaf", "leaf-list"]:
+                    target = self.handle_data_node_type(target_node, target_node.data_path())
+                    self.leafref_targets[target_path] = target
+
+        if target is None:
+            # without the target node, values are generated for the type of the target
+            target = self.handle_type(leaf, node.leafref_type(), name + "target", None if path is None else path + "#target")
+
+        return yangprimitives.yang_boofuzz_map[libyang.Type.LEAFREF](name=name + "data", target=target, path=path)
+
+    def handle_union_node(self, leaf, node, name, path=None):
+        children = [self.handle_type(leaf, n, name + "child" + str(i), None if path is None else path + "#" + str(i))
+                for i, n in enumerate(node.union_types())]
+        return yangprimitives.yang_boofuzz_map[libyang.Type.UNION](name=name + "data", children=children, path=path)
 
     def handle_data_restriction_stmts(self, node_type):
-        max_val = None
-        min_val = None
-        patterns = None
-
-        if node_type.length() is not None:
-            length = node_type.length().split("..")
-            min_val = length[0]
-            max_val = length[1]
-        elif node_type.range() is not None:
-            length = node_type.range().split("..")
-            min_val = length[0]
-            max_val = length[1]
+        # the expressions are parsed into interval sets by the primitives, and all
+        # patterns of the type and the types it is derived from have to hold
+        lengths = node_type.length()
+        ranges = node_type.range() if lengths is None else None
+        patterns = list(node_type.patterns())
 
-        if any(node_type.patterns()):
-            patterns = list(node_type.patterns())[0]
-
-        return max_val, min_val, patterns
+        return lengths, ranges, patterns
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Fuzz YANG model implementation validity on a remote NETCONF server")
-    parser.add_argument('--model-name', dest='model_path', type=str, required=True, help='Path to the model to use for data generation')
-    parser.add_argument('--model-namespace', dest='model_namespace', type=str, required=True, help='Namespace of model to use for data generation')
+    parser.add_argument('--model-name', dest='model_path', type=str, nargs='+', default=[], help='Names of the models to use for data generation')
+    parser.add_argument('--all-models', dest='all_models', action='store_true', help='Fuzz every model advertised by the server that is found in the modules directory')
+    parser.add_argument('--model-namespace', dest='model_namespace', type=str, help='Namespace of model to use for data generation. If not specified, it is read from the model')
     parser.add_argument('--modules-directory', dest='modules_dir', type=str, default='/usr/share/yang/modules', help='Path to the directory with YANG modules')
     parser.add_argument('--ip', dest='ip', type=str, default='172.17.0.2', help='NETCONF target server IP address')
     parser.add_argument('--port', dest='port', type=int, default=830, help='NETCONF target server TCP port')
     parser.add_argument('--user', dest='user', type=str, default='netconf', help='NETCONF target username')
     parser.add_argument('--password', dest='password', type=str, default='netconf', help='NETCONF target password')
     parser.add_argument('--datastore', dest='datastore', type=str, default='running', help='NETCONF target datastore to fuzz')
-    parser.add_argument('--fuzz-xpath', dest='fuzz_xpath', type=str, help='XPath selecting node to be fuzzed. If not specified, the whole model is fuzzed')
-    return parser.parse_args()
+    parser.add_argument('--fuzz-xpath', dest='fuzz_xpath', type=str, nargs='+', help='XPaths selecting the subtrees to be fuzzed. Path segments can be globs, ** matches any number of segments and re: prefixes a regular expression. If not specified, the whole model is fuzzed')
+    parser.add_argument('--workers', dest='workers', type=int, default=1, help='Number of worker processes, each with its own NETCONF session')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=1, help='Number of leaf mutations sent together in one edit-config, rejected batches are bisected')
+    parser.add_argument('--pipeline', dest='pipeline', type=int, default=1, help='Number of RPCs kept in flight on one session using the asyncio NETCONF transport')
+    parser.add_argument('--transport', dest='transport', type=str, default='ssh', choices=['ssh', 'tcp'], help='Transport of the asyncio NETCONF session, ssh requires asyncssh. With tcp every NETCONF session of the run uses plain TCP, including the one that reads the capabilities of the server')
+    parser.add_argument('--rpc-timeout', dest='rpc_timeout', type=float, default=30, help='Seconds to wait for an rpc-reply with the asyncio NETCONF transport')
+    parser.add_argument('--schedule', dest='schedule', type=str, default='sequential', choices=['sequential', 'coverage'], help='Order of the test cases, coverage favours leaves that produce new kinds of replies')
+    parser.add_argument('--plateau', dest='plateau', type=int, default=64, help='Number of test cases without a new kind of reply after which a leaf is no longer fuzzed with --schedule coverage')
+    parser.add_argument('--dedup-size', dest='dedup_size', type=int, default=8, help='MiB per worker for remembering the values already sent for every leaf, values that were sent before are skipped. 0 disables it. Only used when the test cases are sent by the workers, that is with --workers, --batch-size, --pipeline, --schedule coverage, --log, --lazy, --restore, --metrics-port or --oracle; the plain boofuzz session sends every value')
+    parser.add_argument('--max-list-entries', dest='max_list_entries', type=int, default=4096, help='Largest number of entries with unique keys generated for a list in one test case. 1 disables the generation of list entries')
+    parser.add_argument('--restore', dest='restore', action='store_true', help='Restore the datastore after every test case that may have changed it, with <discard-changes/> on the candidate datastore and otherwise with an edit that undoes the changes of the case. Rejected cases are sent with rollback-on-error if the server supports it. Can not be combined with --pipeline')
+    parser.add_argument('--minimize', dest='minimize', type=str, help='Path of a JSON report whose findings are reduced to the smallest payload that still fails the same way, instead of fuzzing. Uses the asyncio NETCONF transport')
+    parser.add_argument('--minimize-case', dest='minimize_case', type=int, nargs='+', help='Indices of the findings to reduce with --minimize. If not specified, all findings are reduced')
+    parser.add_argument('--minimize-sessions', dest='minimize_sessions', type=int, default=4, help='Number of sessions that candidate payloads are sent over at the same time with --minimize')
+    parser.add_argument('--minimize-output', dest='minimize_output', type=str, help='Directory to write the reduced payloads to with --minimize')
+    parser.add_argument('--recovery-timeout', dest='recovery_timeout', type=float, default=300, help='Seconds to wait for the server to accept sessions again after a failure. A worker whose server stays down stops and reports what it has found so far')
+    parser.add_argument('--metrics-port', dest='metrics_port', type=int, help='Serve the latency histograms by schema path and reply class in the Prometheus text format on this port of 127.0.0.1 during the run, worker N uses the port plus N')
+    parser.add_argument('--oracle', dest='oracle', action='store_true', help='Validate every test case with libyang before it is sent, and report the cases that the server accepts although libyang rejects them, or the other way round, as findings')
+    parser.add_argument('--oracle-threads', dest='oracle_threads', type=int, default=4, help='Number of threads per worker that validate test cases with --oracle')
+    parser.add_argument('--oracle-batch', dest='oracle_batch', type=int, default=64, help='Number of test cases validated together with --oracle')
+    parser.add_argument('--oracle-sample-invalid', dest='oracle_sample_invalid', type=float, default=1.0, help='Share of the test cases rejected by libyang that are still sent with --oracle, between 0 and 1. The server is expected to reject them as well')
+    parser.add_argument('--load-rate', dest='load_rate', type=float, help='Send the test cases at this fixed number per second, whether the replies are back or not, and report the throughput, error rates and latency instead of fuzzing. Uses the asyncio NETCONF transport')
+    parser.add_argument('--load-ramp', dest='load_ramp', type=str, help='Like --load-rate, with a rate that goes up linearly, given as START:END:SECONDS')
+    parser.add_argument('--load-duration', dest='load_duration', type=float, help='Seconds to send test cases for with --load-rate, 60 by default, or the length of the ramp')
+    parser.add_argument('--load-sessions', dest='load_sessions', type=int, default=4, help='Number of sessions the load is spread over')
+    parser.add_argument('--load-interval', dest='load_interval', type=float, default=5, help='Seconds per line of the load report')
+    parser.add_argument('--seed', dest='seed', type=int, help='Seed of the generated values, between 0 and 2^64 - 1. If not specified, a random seed is used and printed')
+    parser.add_argument('--lazy', dest='lazy', action='store_true', help='Build every request only when it is fuzzed and release it afterwards, to keep the memory use flat on large models')
+    parser.add_argument('--cache-dir', dest='cache_dir', type=str, default=treecache.default_cache_dir(), help='Directory with cached fuzz trees of previously parsed modules')
+    parser.add_argument('--no-cache', dest='cache', action='store_false', help='Always parse the module instead of using the fuzz tree cache')
+    parser.add_argument('--log', dest='log', type=str, help='Path of a binary result log the test cases are appended to, with one file per worker')
+    parser.add_argument('--report', dest='report', type=str, help='Path of a JSON file to write the merged worker report to')
+    args = parser.parse_args()
+
+    if not args.model_path and not args.all_models:
+        parser.error("one of --model-name or --all-models is required")
+    if args.model_namespace is not None and len(args.model_path) != 1:
+        parser.error("--model-namespace can only be used with a single --model-name")
+    if args.restore and args.pipeline > 1:
+        # the restore of a case would undo or snapshot the changes of the cases in flight with it
+        parser.error("--restore can not be combined with --pipeline")
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 32)
+    elif not 0 <= args.seed < 2 ** 64:
+        # the result log stores the seed as an unsigned 64 bit integer
+        parser.error("--seed has to be between 0 and 2^64 - 1")
+
+    return args
+
+def model_names(args, index, available):
+    if not args.all_models:
+        return args.model_path
+
+    return sorted(name for name in index.module_names() if name in available)
+
+def interleave(requests):
+    # round robin over the models, so that an interrupted run has covered all of them
+    pending = collections.deque(iter(r) for r in requests)
+
+    while pending:
+        it = pending.popleft()
+        node = next(it, None)
+        if node is not None:
+            yield node
+            pending.append(it)
+
+def build_model_requests(args, name, capabilities, raw_conn, index, available, get_ctx):
+    files = []
+    if args.cache:
+        files = treecache.module_files(args.modules_dir, name, available)
+
+    # without the module sources there is nothing to key the cache on
+    if not files:
+        parser = ModuleParser(args.modules_dir, name, args.model_namespace, capabilities, raw_conn, args.fuzz_xpath, ctx=get_ctx(), index=index,
+                max_list_entries=args.max_list_entries)
+        nodes = oracle.tag_module(parser.iter_module(), name, parser.enabled_features)
+        return nodes if args.lazy else list(nodes)
+
+    text = files[0][2].decode()
+    version = parse_yang_version(text)
+    namespace = args.model_namespace
+    if namespace is None:
+        namespace = parse_namespace(text)
+    features = get_enabled_features(name, index, version)
+
+    cache = treecache.TreeCache(args.cache_dir)
+    key = treecache.cache_key(files, features, args.fuzz_xpath, namespace, args.max_list_entries)
+
+    if args.lazy:
+        nodes = cache.load_lazy(key)
+        if nodes is None:
+            parser = ModuleParser(args.modules_dir, name, namespace, capabilities, raw_conn, args.fuzz_xpath, features, get_ctx(),
+                    max_list_entries=args.max_list_entries)
+            nodes = cache.store_lazy(key, parser.iter_module())
+        return oracle.tag_module(nodes, name, features)
+
+    nodes = cache.load(key)
+    if nodes is None:
+        parser = ModuleParser(args.modules_dir, name, namespace, capabilities, raw_conn, args.fuzz_xpath, features, get_ctx(),
+                    max_list_entries=args.max_list_entries)
+        nodes = parser.parse_module()
+        cache.store(key, nodes)
+
+    return list(oracle.tag_module(nodes, name, features))
+
+def build_requests(args):
+    if args.transport == "tcp":
+        # the server does not speak SSH on this port, so ncclient cannot be used
+        conn = raw_conn = transport.SyncSession(args)
+    else:
+        conn = boofuzz.NETCONFConnection(args.ip, args.port, args.user, args.password, args.datastore, False)
+        conn.open()
+        raw_conn = conn.get_raw_conn()
+    capabilities = raw_conn.server_capabilities
+
+    cache_dir = args.cache_dir if args.cache else None
+    index = yanglibrary.FeatureIndex(capabilities, raw_conn, cache_dir)
+    available = treecache.index_modules(args.modules_dir)
+    ctx = []
+
+    def get_ctx():
+        # only created once a model is not found in the cache
+        if not ctx:
+            ctx.append(libyang.Context(args.modules_dir))
+        return ctx[0]
+
+    requests = []
+    for name in model_names(args, index, available):
+        try:
+            requests.append(build_model_requests(args, name, capabilities, raw_conn, index, available, get_ctx))
+        except libyang.LibyangError as e:
+            if not args.all_models:
+                raise
+            print("skipping model {}: {}".format(name, e))
+    conn.close()
+
+    nodes = interleave(requests)
+    if args.lazy:
+        return nodes
+    return list(nodes)
 
 def main():
     args = parse_args()
 
+    if args.minimize is not None:
+        minimize.minimize_report(args, build_requests)
+        return
+
+    randomstream.set_run_seed(args.seed)
+    print("using seed {}".format(args.seed))
+
+    if args.load_rate is not None or args.load_ramp is not None:
+        load.load(args, build_requests(args))
+        return
+
+    if args.workers > 1 or args.batch_size > 1 or args.pipeline > 1 or args.schedule == "coverage" or args.log is not None or args.lazy or args.restore or args.metrics_port is not None or args.oracle or args.transport == "tcp":
+        workers.fuzz_parallel(args)
+        return
+
     conn = boofuzz.NETCONFConnection(args.ip, args.port, args.user, args.password, args.datastore, False)
     session = boofuzz.Session(target=boofuzz.Target(connection = conn))
 
-    conn.open()
-    raw_conn = conn.get_raw_conn()
-    capabilities = raw_conn.server_capabilities
-    parser = ModuleParser(args.modules_dir, args.model_path, args.model_namespace, capabilities, raw_conn, args.fuzz_xpath)
-    nodes = parser.parse_module()
-    conn.close()
+    nodes = build_requests(args)
 
     for node in nodes:
         session.connect(node)
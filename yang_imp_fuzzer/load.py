@@ -0,0 +1,175 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import asyncio
+import itertools
+import json
+from yang_imp_fuzzer import batch
+from yang_imp_fuzzer import metrics
+from yang_imp_fuzzer import scheduler
+from yang_imp_fuzzer import transport
+
+def parse_ramp(ramp):
+    # "start:end:seconds", the rate goes up linearly from start to end
+    start, end, seconds = (float(v) for v in ramp.split(":"))
+    return start, end, seconds
+
+def rate_at(args, t):
+    if args.load_ramp is None:
+        return args.load_rate
+    start, end, seconds = parse_ramp(args.load_ramp)
+    return start + (end - start) * min(t / seconds, 1.0) if seconds > 0 else end
+
+def load_duration(args):
+    if args.load_ramp is not None and args.load_duration is None:
+        return parse_ramp(args.load_ramp)[2]
+    return args.load_duration if args.load_duration is not None else 60.0
+
+def iter_load_cases(nodes):
+    # the test cases of all requests, over and over again
+    while True:
+        empty = True
+        for _, node, mutations in scheduler.iter_cases(nodes):
+            empty = False
+            yield node, mutations
+        if empty:
+            return
+
+class Interval:
+    def __init__(self, rate):
+        self.rate = rate
+        self.sent = 0
+        self.completed = 0
+        self.classes = {}
+        self.latency = metrics.Histogram()
+
+    def summary(self, seconds):
+        failed = self.classes.get("timeout", 0) + self.classes.get("crash", 0)
+        rejected = sum(count for reply_class, count in self.classes.items() if reply_class.startswith("rpc-error"))
+        replies = max(1, sum(self.classes.values()))
+        return {
+            "target rps": self.rate,
+            "sent": self.sent,
+            "rps": self.completed / seconds,
+            "failed %": 100.0 * failed / replies,
+            "rejected %": 100.0 * rejected / replies,
+            "p50 ms": self.latency.percentile(0.5) * 1000,
+            "p99 ms": self.latency.percentile(0.99) * 1000,
+            "p99.9 ms": self.latency.percentile(0.999) * 1000,
+        }
+
+# Open-loop load: test cases are sent at the times the rate asks for, whether the replies
+# of the earlier ones are back or not, over several sessions. Latency is measured from the
+# time a case was due, so a server that falls behind shows its queueing delay instead of
+# slowing the load down.
+async def run_load(args, nodes):
+    sessions = [await transport.connect(args) for _ in range(args.load_sessions)]
+    loop = asyncio.get_event_loop()
+    duration = load_duration(args)
+    intervals = {}
+    total = Interval(None)
+    tasks = set()
+
+    def interval(t):
+        index = int(t // args.load_interval)
+        if index not in intervals:
+            intervals[index] = Interval(rate_at(args, (index + 0.5) * args.load_interval))
+        return intervals[index]
+
+    async def send(session, node, mutations, due):
+        data = batch.render(node, mutations)
+        reply = await session.edit_config(args.datastore, data)
+        done = loop.time()
+
+        latency = done - (start + due)
+        for stats in [interval(due), total]:
+            stats.classes[reply[2]] = stats.classes.get(reply[2], 0) + 1
+            stats.latency.record(latency)
+        interval(min(done - start, duration - 1e-9)).completed += 1
+        total.completed += 1
+
+    cases = iter_load_cases(nodes)
+    start = loop.time()
+    due = 0.0
+    turn = itertools.cycle(range(len(sessions)))
+
+    while due < duration:
+        # also yields to the replies when the load is behind
+        await asyncio.sleep(max(0.0, due - (loop.time() - start)))
+
+        case = next(cases, None)
+        if case is None:
+            break
+
+        i = next(turn)
+        if sessions[i].closed:
+            await sessions[i].close()
+            sessions[i] = await transport.connect(args)
+
+        task = asyncio.ensure_future(send(sessions[i], case[0], case[1], due))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        interval(due).sent += 1
+        total.sent += 1
+
+        rate = rate_at(args, due)
+        if rate <= 0:
+            break
+        due += 1.0 / rate
+
+    if tasks:
+        await asyncio.gather(*list(tasks))
+    elapsed = loop.time() - start
+    for session in sessions:
+        await session.close()
+
+    total.rate = total.sent / duration
+    return {
+        "duration": duration,
+        "sessions": args.load_sessions,
+        "total": total.summary(elapsed),
+        "classes": total.classes,
+        "intervals": [dict(intervals[i].summary(args.load_interval), start=i * args.load_interval)
+                for i in sorted(intervals)],
+    }
+
+def print_load_report(report):
+    print("{:>8} {:>10} {:>10} {:>9} {:>10} {:>9} {:>9} {:>9}".format("second", "target", "rps", "failed %",
+            "rejected %", "p50 ms", "p99 ms", "p99.9 ms"))
+    for row in report["intervals"] + [dict(report["total"], start="total")]:
+        print("{:>8} {:>10.1f} {:>10.1f} {:>9.2f} {:>10.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(row["start"],
+                row["target rps"], row["rps"], row["failed %"], row["rejected %"], row["p50 ms"], row["p99 ms"],
+                row["p99.9 ms"]))
+
+def load(args, nodes):
+    loop = asyncio.new_event_loop()
+    try:
+        report = loop.run_until_complete(run_load(args, nodes))
+    finally:
+        loop.close()
+
+    report["seed"] = args.seed
+    print_load_report(report)
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return report
@@ -0,0 +1,180 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import http.server
+import threading
+
+# Latencies are counted in log-linear buckets of microseconds, like an HDR histogram:
+# below 2 * sub_buckets every microsecond has its own bucket, above that every power of
+# two is split into sub_buckets buckets, which keeps the error of a value below 1/64.
+# All histograms share the bucket layout, so merging them adds up their counts.
+sub_bucket_bits = 6
+sub_buckets = 1 << sub_bucket_bits
+
+def bucket_bounds(index):
+    # lowest value of the bucket and the lowest value of the next one, in microseconds
+    if index < sub_buckets:
+        return index, index + 1
+    shift = (index >> sub_bucket_bits) - 1
+    lower = ((index & (sub_buckets - 1)) + sub_buckets) << shift
+    return lower, lower + (1 << shift)
+
+def bucket_index(seconds):
+    us = int(seconds * 1000000)
+    if us < sub_buckets:
+        return us
+    shift = us.bit_length() - sub_bucket_bits - 1
+    return ((shift + 1) << sub_bucket_bits) + (us >> shift) - sub_buckets
+
+class Histogram:
+    __slots__ = ["counts", "count", "sum"]
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        i = bucket_index(seconds)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        for i, count in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding the value, in seconds
+        rank = fraction * self.count
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return bucket_bounds(i)[1] / 1000000
+        return 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.sum, "buckets": {str(i): c for i, c in sorted(self.counts.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        res = cls()
+        res.counts = {int(i): c for i, c in data["buckets"].items()}
+        res.count = data["count"]
+        res.sum = data["sum"]
+        return res
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+# Latency histograms of the RPCs, by the schema path of the fuzzed leaf and the reply class.
+class LatencyMetrics:
+    def __init__(self):
+        # schema path, then reply class
+        self.histograms = {}
+
+    def path_classes(self, t):
+        # the histograms of every leaf of a template by its qualified name, kept on the
+        # template, so the paths are only looked up once per request
+        classes = {name: self.histograms.setdefault(path, {}) for name, path in t.paths.items()}
+        t.latency_classes = self, classes
+        return classes
+
+    def record(self, t, mutations, reply_class, seconds):
+        # one RPC for the leaves of all mutations
+        cached = t.latency_classes
+        classes = cached[1] if cached is not None and cached[0] is self else self.path_classes(t)
+
+        for m in mutations:
+            by_class = classes[m.qualified_name]
+            histogram = by_class.get(reply_class)
+            if histogram is None:
+                histogram = by_class[reply_class] = Histogram()
+            histogram.record(seconds)
+
+    def items(self):
+        # the paths and classes keep changing while they are read, the copies are taken under the GIL
+        for path, by_class in list(self.histograms.items()):
+            for reply_class, histogram in list(by_class.items()):
+                yield path, reply_class, histogram
+
+    def to_report(self):
+        res = {}
+        for path, reply_class, histogram in sorted(self.items(), key=lambda h: h[:2]):
+            res.setdefault(path, {})[reply_class] = histogram.to_dict()
+        return res
+
+    def merge_report(self, data):
+        for path, classes in data.items():
+            by_class = self.histograms.setdefault(path, {})
+            for reply_class, histogram in classes.items():
+                if reply_class not in by_class:
+                    by_class[reply_class] = Histogram()
+                by_class[reply_class].merge(Histogram.from_dict(histogram))
+
+    def slowest(self, count=10, fraction=0.99):
+        res = [(h.percentile(fraction), path, reply_class, h.count) for path, reply_class, h in self.items()]
+        return sorted(res, reverse=True)[:count]
+
+    def prometheus(self):
+        lines = [
+            "# HELP yang_fuzzer_rpc_latency_seconds Latency of the edit-config RPCs by schema path and reply class",
+            "# TYPE yang_fuzzer_rpc_latency_seconds histogram",
+        ]
+
+        for path, reply_class, histogram in self.items():
+            counts = dict(histogram.counts)
+            labels = 'path="{}",class="{}"'.format(escape(path), escape(reply_class))
+            total = 0
+            for i in sorted(counts):
+                total += counts[i]
+                lines.append("yang_fuzzer_rpc_latency_seconds_bucket{{{},le=\"{}\"}} {}".format(
+                        labels, bucket_bounds(i)[1] / 1000000, total))
+            lines.append("yang_fuzzer_rpc_latency_seconds_bucket{{{},le=\"+Inf\"}} {}".format(labels, total))
+            lines.append("yang_fuzzer_rpc_latency_seconds_sum{{{}}} {}".format(labels, histogram.sum))
+            lines.append("yang_fuzzer_rpc_latency_seconds_count{{{}}} {}".format(labels, total))
+
+        return "\n".join(lines) + "\n"
+
+def serve(metrics, port, host="127.0.0.1"):
+    # a Prometheus text endpoint on /metrics, served from a thread of its own
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.HTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
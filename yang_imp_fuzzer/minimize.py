@@ -0,0 +1,340 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+from boofuzz.mutation import Mutation
+from xml.etree import ElementTree
+from yang_imp_fuzzer import randomstream
+from yang_imp_fuzzer import restore
+from yang_imp_fuzzer import template
+from yang_imp_fuzzer import transport
+
+int_re = re.compile(r"-?\d+")
+
+def case_mutations(node, finding):
+    # the values of a finding are regenerated from their mutation indices
+    items = {item.qualified_name: item for item in node.walk() if item.fuzzable}
+    res = []
+
+    for name, index in finding["mutations"]:
+        item = items[name]
+        if hasattr(item, "mutation"):
+            value = item.mutation(index, item.stream_key())
+        else:
+            value = next(itertools.islice(item.get_mutations(), index, None))[0].value
+        res.append(Mutation(value, name, index))
+
+    return res
+
+def element_keys(root):
+    # elements by their position, as tag and number among the siblings with the same tag
+    keys = {}
+
+    def walk(element, key):
+        keys[id(element)] = key
+        seen = {}
+        for child in element:
+            nth = seen[child.tag] = seen.get(child.tag, -1) + 1
+            walk(child, key + ((child.tag, nth),))
+
+    walk(root, ())
+    return keys
+
+def default_values(root):
+    keys = element_keys(root)
+    return {keys[id(e)]: e.text for e in root.iter() if len(e) == 0}
+
+def pruned(element, drop, values):
+    res = ElementTree.Element(element.tag, element.attrib)
+    res.text = values.get(id(element), element.text)
+    res.tail = element.tail
+    for child in element:
+        if id(child) not in drop:
+            res.append(pruned(child, drop, values))
+    return res
+
+def elements_at(root, depth):
+    level = [root]
+    for _ in range(depth):
+        level = [child for element in level for child in element]
+    return level
+
+def split(items, n):
+    size, rest = divmod(len(items), n)
+    chunks = []
+    start = 0
+    for i in range(n):
+        end = start + size + (1 if i < rest else 0)
+        chunks.append(items[start:end])
+        start = end
+    return [c for c in chunks if c]
+
+class SessionPool:
+    def __init__(self, args, size):
+        self.args = args
+        self.free = asyncio.Queue()
+        for _ in range(size):
+            self.free.put_nowait(None)
+
+    async def send(self, payload):
+        session = await self.free.get()
+        try:
+            if session is None:
+                session = await transport.connect(self.args)
+            reply = await session.edit_config(self.args.datastore, payload)
+        except (OSError, asyncio.TimeoutError, transport.TransportClosed) as e:
+            reply = "error", str(e), "crash", 0.0
+
+        # a session that saw a timeout or a crash is not used again
+        if reply[0] == "error" and session is not None:
+            await session.close()
+            session = None
+        self.free.put_nowait(session)
+        return reply
+
+    async def close(self):
+        while not self.free.empty():
+            session = self.free.get_nowait()
+            if session is not None:
+                await session.close()
+
+async def alive(args):
+    try:
+        session = await asyncio.wait_for(transport.connect(args), args.rpc_timeout)
+    except Exception:
+        # whatever keeps the session from being set up counts as down
+        return False
+
+    try:
+        await session.get_config("running", b"")
+        return True
+    except (asyncio.TimeoutError, transport.TransportClosed, ConnectionError):
+        return False
+    finally:
+        await session.close()
+
+# Delta debugging of a failing payload. Subtrees are removed level by level, then leaves
+# are reset to the values of the request without mutations and the remaining values are
+# shrunk, as long as the server still fails with the same reply class. Candidates are sent
+# together over several sessions, and failures among them are confirmed one at a time
+# since a crash also fails the cases sent next to it.
+class Minimizer:
+    def __init__(self, args, pool, defaults=None):
+        self.args = args
+        self.pool = pool
+        self.defaults = defaults or {}
+        self.results = {}
+        self.tries = 0
+        self.target = None
+
+    async def wait_alive(self):
+        deadline = time.monotonic() + self.args.recovery_timeout
+        while not await alive(self.args):
+            if time.monotonic() > deadline:
+                raise RuntimeError("server did not recover within {}s".format(self.args.recovery_timeout))
+            await asyncio.sleep(1)
+
+    async def send(self, payload):
+        self.tries += 1
+        return await self.pool.send(payload)
+
+    def fails(self, reply):
+        return reply[0] == "error" and reply[2] == self.target
+
+    async def check(self, payloads):
+        # index of the first payload that reproduces the failure
+        keys = [hashlib.blake2b(p, digest_size=16).digest() for p in payloads]
+        pending = [i for i, key in enumerate(keys) if key not in self.results]
+        replies = await asyncio.gather(*[self.send(payloads[i]) for i in pending])
+
+        suspects = set()
+        for i, reply in zip(pending, replies):
+            if self.fails(reply) and len(pending) > 1:
+                suspects.add(i)
+            else:
+                self.results[keys[i]] = self.fails(reply)
+        if any(reply[0] == "error" for reply in replies):
+            await self.wait_alive()
+
+        for i in range(len(payloads)):
+            if i in suspects:
+                reply = await self.send(payloads[i])
+                self.results[keys[i]] = self.fails(reply)
+                if reply[0] == "error":
+                    await self.wait_alive()
+            if self.results[keys[i]]:
+                return i
+
+        return None
+
+    async def ddmin(self, items, render):
+        # the smallest subset of items found for which render still fails
+        if await self.check([render([])]) is not None:
+            return []
+
+        n = 2
+        while len(items) >= 2:
+            chunks = split(items, n)
+            i = await self.check([render(c) for c in chunks])
+            if i is not None:
+                items, n = chunks[i], 2
+                continue
+
+            if len(chunks) > 2:
+                complements = [[e for c in chunks[:j] + chunks[j + 1:] for e in c] for j in range(len(chunks))]
+                i = await self.check([render(c) for c in complements])
+                if i is not None:
+                    items, n = complements[i], max(n - 1, 2)
+                    continue
+
+            if n >= len(items):
+                break
+            n = min(len(items), n * 2)
+
+        return items
+
+    async def reduce_tree(self, root):
+        # the config element and the top-level node are kept
+        depth = 2
+        while True:
+            items = elements_at(root, depth)
+            if not items:
+                return root
+
+            def render(kept):
+                kept = {id(e) for e in kept}
+                return ElementTree.tostring(pruned(root, {id(e) for e in items if id(e) not in kept}, {}))
+
+            kept = {id(e) for e in await self.ddmin(items, render)}
+            root = pruned(root, {id(e) for e in items if id(e) not in kept}, {})
+            depth += 1
+
+    async def reduce_values(self, root):
+        keys = element_keys(root)
+        values = {}
+
+        def render(changes):
+            return ElementTree.tostring(pruned(root, set(), {**values, **changes}))
+
+        for leaf in [e for e in root.iter() if len(e) == 0 and e.text]:
+            default = self.defaults.get(keys[id(leaf)])
+            if default is not None and default != leaf.text:
+                if await self.check([render({id(leaf): default})]) is not None:
+                    values[id(leaf)] = default
+                    continue
+
+            text = leaf.text
+            if int_re.fullmatch(text.strip()):
+                # halved towards zero while it still fails
+                value = int(text)
+                while value not in [0, -1]:
+                    candidate = value // 2 if value > 0 else -(-value // 2)
+                    if await self.check([render({id(leaf): str(candidate)})]) is None:
+                        break
+                    value = candidate
+                    values[id(leaf)] = str(value)
+            else:
+                chars = await self.ddmin(list(text), lambda kept: render({id(leaf): "".join(kept)}))
+                values[id(leaf)] = "".join(chars)
+
+        return pruned(root, set(), values)
+
+    async def minimize(self, payload):
+        root = restore.parse_payload(payload)
+        if root is None:
+            return None
+
+        # the class the payload fails with now, which every reduction has to keep
+        reply = await self.send(payload)
+        if reply[0] != "error":
+            return None
+        self.target = reply[2]
+        self.results[hashlib.blake2b(payload, digest_size=16).digest()] = True
+        await self.wait_alive()
+
+        root = await self.reduce_tree(root)
+        root = await self.reduce_values(root)
+        return ElementTree.tostring(root)
+
+def find_node(nodes, name):
+    return next((node for node in nodes if node.name == name), None)
+
+async def minimize_findings(args, findings, nodes):
+    pool = SessionPool(args, args.minimize_sessions)
+    results = []
+
+    try:
+        for finding in findings:
+            node = find_node(nodes, finding["request"])
+            defaults = None
+            if node is not None:
+                t = template.get_template(node)
+                payload = t.render(case_mutations(node, finding))
+                defaults = default_values(restore.parse_payload(t.render([])))
+            elif finding.get("payload") is not None:
+                payload = finding["payload"].encode()
+            else:
+                print("case {}: request {} not found".format(finding["index"], finding["request"]))
+                continue
+
+            minimizer = Minimizer(args, pool, defaults)
+            reduced = await minimizer.minimize(payload)
+            if reduced is None:
+                print("case {}: the failure does not reproduce".format(finding["index"]))
+                continue
+
+            print("case {}: {} reduced from {} to {} bytes in {} tries".format(finding["index"], minimizer.target,
+                    len(payload), len(reduced), minimizer.tries))
+            print(reduced.decode())
+            results.append((finding, reduced))
+
+            if args.minimize_output is not None:
+                os.makedirs(args.minimize_output, exist_ok=True)
+                with open(os.path.join(args.minimize_output, "case-{}.xml".format(finding["index"])), "wb") as f:
+                    f.write(reduced)
+    finally:
+        await pool.close()
+
+    return results
+
+def minimize_report(args, build_requests):
+    with open(args.minimize) as f:
+        report = json.load(f)
+
+    # the values are regenerated with the seed of the run that found them
+    randomstream.set_run_seed(report.get("seed", args.seed))
+    # disagreements with libyang and a server that stayed down are not failures that could be reduced
+    findings = [f for f in report["findings"] if "oracle" not in f and not f.get("down")]
+    if args.minimize_case is not None:
+        findings = [f for f in findings if f["index"] in args.minimize_case]
+
+    nodes = list(build_requests(args))
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(minimize_findings(args, findings, nodes))
+    finally:
+        loop.close()
@@ -0,0 +1,188 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import collections
+import concurrent.futures
+import hashlib
+import libyang
+import re
+import threading
+from yang_imp_fuzzer import dedup
+from yang_imp_fuzzer import template
+
+VALID = "valid"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+# verdicts remembered per worker, about 100 bytes each
+cache_entries = 1 << 20
+
+config_re = re.compile(rb"^\s*<nc:config[^>]*>(.*)</nc:config>\s*$", re.DOTALL)
+
+# Errors that depend on the rest of the datastore, which the payload alone does not show.
+# The edit is merged into the datastore, so mandatory nodes, the minimum number of list
+# entries and unique values may well be satisfied by the configuration already there.
+context_re = re.compile("|".join([
+    r"points to a non-existing leaf",
+    r"Required instance of",
+    r"Must condition",
+    r"When condition",
+    r"Missing required element",
+    r"Mandatory choice",
+    r"Too few",
+    r"Unique data leaf",
+]))
+
+def fingerprint(node, mutations):
+    h = hashlib.blake2b(node.name.encode(), digest_size=16)
+    for m in mutations:
+        h.update(b"\0" + dedup.fingerprint(m))
+    return h.digest()
+
+def sampled(key, fraction):
+    # the same cases are kept in every run, whatever the order they come in
+    return int.from_bytes(key[:8], "little") < fraction * 2 ** 64
+
+def tag_module(nodes, name, features):
+    # the local validation needs the module and features a request was generated from
+    for node in nodes:
+        node.yang_module = name, features
+        yield node
+
+class Validator:
+    def __init__(self, modules_dir):
+        self.modules_dir = modules_dir
+        self.local = threading.local()
+
+    def context(self, module):
+        # libyang contexts are not shared between threads, every thread builds its own
+        local = self.local
+        if not hasattr(local, "ctx"):
+            local.ctx = libyang.Context(self.modules_dir)
+            local.modules = set()
+
+        if module is not None and module[0] not in local.modules:
+            name, features = module
+            m = local.ctx.load_module(name)
+            names = [f.name() for f in m.features()]
+            for f in features:
+                if f in names:
+                    m.feature_enable(f)
+            local.modules.add(name)
+
+        return local.ctx
+
+    def validate(self, module, payload):
+        match = config_re.match(payload)
+        if match is None:
+            return UNKNOWN, "not a config element"
+
+        try:
+            ctx = self.context(module)
+            dnode = ctx.parse_data_mem(match.group(1).decode(), "xml", config=True, strict=True)
+        except libyang.LibyangError as e:
+            reason = str(e)
+            return (UNKNOWN if context_re.search(reason) else INVALID), reason
+
+        if dnode is not None:
+            dnode.free()
+        return VALID, None
+
+# Wraps a scheduler and validates the payload of every case with libyang before it is
+# sent. Cases are validated in batches by a pool of threads, the parsing in libyang does
+# not hold the GIL. Verdicts are cached by the values of the case, and only a share of
+# the cases that libyang rejects is sent, since the server is expected to reject them too.
+# The verdicts are compared with the replies of the server in disagreement().
+class Oracle:
+    def __init__(self, scheduler, modules_dir, threads=4, batch=64, sample_invalid=1.0):
+        self.scheduler = scheduler
+        self.validator = Validator(modules_dir)
+        self.pool = concurrent.futures.ThreadPoolExecutor(threads)
+        self.batch = batch
+        self.sample_invalid = sample_invalid
+        self.verdicts = collections.OrderedDict()
+        self.counts = dict.fromkeys([VALID, INVALID, UNKNOWN, "cache hits", "skipped", "accepted-invalid",
+                "rejected-valid"], 0)
+
+    def remember(self, key, verdict):
+        self.verdicts[key] = verdict
+        if len(self.verdicts) > cache_entries:
+            self.verdicts.popitem(last=False)
+
+    def validate(self, node, mutations):
+        t = template.get_template(node)
+        if t.streamed(mutations):
+            # too large to be rendered as a whole
+            return UNKNOWN, "not validated"
+        return self.validator.validate(getattr(node, "yang_module", None), t.render(mutations))
+
+    def classify(self, cases):
+        keys = [fingerprint(node, mutations) for _, node, mutations in cases]
+        missing = {}
+        for key, (_, node, mutations) in zip(keys, cases):
+            if key in self.verdicts or key in missing:
+                self.counts["cache hits"] += 1
+            else:
+                missing[key] = self.pool.submit(self.validate, node, mutations)
+
+        for key, future in missing.items():
+            verdict = future.result()
+            self.remember(key, verdict)
+            self.counts[verdict[0]] += 1
+
+        for key, case in zip(keys, cases):
+            if self.verdicts[key][0] == INVALID and not sampled(key, self.sample_invalid):
+                self.counts["skipped"] += 1
+                continue
+            yield case
+
+    def cases(self):
+        pending = []
+        for case in self.scheduler.cases():
+            pending.append(case)
+            if len(pending) >= self.batch:
+                yield from self.classify(pending)
+                pending = []
+        yield from self.classify(pending)
+
+    def record(self, mutations, reply_class):
+        self.scheduler.record(mutations, reply_class)
+
+    def verdict(self, node, mutations):
+        key = fingerprint(node, mutations)
+        if key not in self.verdicts:
+            # the parts of a bisected batch are validated when their reply is there
+            self.remember(key, self.validate(node, mutations))
+        return self.verdicts[key]
+
+    def disagreement(self, node, mutations, outcome, reason):
+        # kind and reason of a finding if the server and libyang do not agree on the case
+        verdict, local_reason = self.verdict(node, mutations)
+        if outcome == "ok" and verdict == INVALID:
+            self.counts["accepted-invalid"] += 1
+            return "accepted-invalid", "accepted by the server, rejected by libyang: {}".format(local_reason)
+        if outcome == "rpc-error" and verdict == VALID:
+            self.counts["rejected-valid"] += 1
+            return "rejected-valid", "rejected by the server, accepted by libyang: {}".format(reason)
+        return None
+
+    def close(self):
+        self.pool.shutdown()
@@ -0,0 +1,99 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import hashlib
+import random
+
+MASK = 2 ** 64 - 1
+GOLDEN = 0x9E3779B97F4A7C15
+
+# seed of the current run, every primitive stream is derived from it and a schema path
+run_seed = 0
+
+def set_run_seed(seed):
+    global run_seed
+    run_seed = seed
+
+def stream_key(seed, path):
+    digest = hashlib.blake2b("{}\0{}".format(seed, path).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def mix(z):
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+# A splitmix64 counter generator. The n-th output only depends on the key and n, so
+# the generator for mutation index i of a stream is created directly, without drawing
+# the values of the mutations before it.
+class CounterRandom(random.Random):
+    def __init__(self, key):
+        self.key = key
+        self.counter = 0
+        super(CounterRandom, self).__init__()
+
+    def seed(self, *args, **kwargs):
+        self.counter = 0
+
+    def next64(self):
+        self.counter += 1
+        return mix((self.key + self.counter * GOLDEN) & MASK)
+
+    def random(self):
+        return (self.next64() >> 11) * (1.0 / 2 ** 53)
+
+    def getrandbits(self, k):
+        res = 0
+        bits = 0
+        while bits < k:
+            res = (res << 64) | self.next64()
+            bits += 64
+        return res >> (bits - k)
+
+def at(key, index):
+    return CounterRandom(mix((key ^ (index * GOLDEN)) & MASK))
+
+# A keyed bijection of range(n), a small Feistel network over the next even number of
+# bits with cycle walking. The first k outputs are k distinct values, so a domain is
+# sampled without replacement while every position is still computed directly.
+class Permutation:
+    rounds = 4
+
+    def __init__(self, key, n):
+        self.key = key
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+
+    def encrypt(self, x):
+        left = x >> self.half
+        right = x & self.mask
+        for r in range(1, self.rounds + 1):
+            left, right = right, left ^ (mix((self.key ^ (r * GOLDEN) ^ right) & MASK) & self.mask)
+        return (left << self.half) | right
+
+    def at(self, index):
+        # values outside of range(n) are encrypted again until they fall into it
+        value = self.encrypt(index)
+        while value >= self.n:
+            value = self.encrypt(value)
+        return value
@@ -0,0 +1,250 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import asyncio
+import copy
+import io
+import re
+from ncclient.operations import RPCError, TimeoutExpiredError
+from ncclient.transport import TransportError
+from xml.etree import ElementTree
+from yang_imp_fuzzer import transport
+
+NC_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+OPERATION = "{" + NC_NS + "}operation"
+ROLLBACK_ON_ERROR = "urn:ietf:params:netconf:capability:rollback-on-error:1.0"
+
+prefix_re = re.compile(r"([A-Za-z_][\w.-]*):")
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def text(element):
+    return (element.text or "").strip()
+
+def parse_config(data):
+    # ElementTree drops the namespace declarations that are only used in values, like the
+    # prefixes of identityref and instance-identifier values, so leaves keep them as attributes
+    scopes = [{}]
+    pending = {}
+    root = None
+
+    for event, item in ElementTree.iterparse(io.BytesIO(data), events=("start-ns", "start", "end")):
+        if event == "start-ns":
+            pending[item[0]] = item[1]
+        elif event == "start":
+            if root is None:
+                root = item
+            scopes.append(dict(scopes[-1], **pending) if pending else scopes[-1])
+            pending = {}
+        else:
+            scope = scopes.pop()
+            if len(item) == 0 and item.text and ":" in item.text:
+                for prefix in prefix_re.findall(item.text):
+                    if prefix in scope:
+                        item.set("xmlns:" + prefix, scope[prefix])
+
+    return root
+
+def subtree_filter(root):
+    # selects the top-level node the payload was rendered for
+    return ElementTree.tostring(ElementTree.Element(root[0].tag))
+
+def entry_key(element, keys):
+    return tuple(next((text(c) for c in element if local_name(c.tag) == key), None) for key in keys)
+
+def find_match(base, element, path, list_keys):
+    candidates = [c for c in base if c.tag == element.tag]
+    if path not in list_keys:
+        return candidates[0] if candidates else None
+
+    keys = list_keys[path]
+    if keys is None:
+        # leaf-list entries are identified by their value
+        return next((c for c in candidates if text(c) == text(element)), None)
+    key = entry_key(element, keys)
+    return next((c for c in candidates if entry_key(c, keys) == key), None)
+
+def identity(element, keys):
+    # an element that only selects element, with the keys if it is a list entry
+    res = ElementTree.Element(element.tag)
+    for key in keys or []:
+        res.extend(copy.deepcopy(c) for c in element if local_name(c.tag) == key)
+    return res
+
+def removal(element, path, list_keys):
+    res = identity(element, list_keys.get(path))
+    if path in list_keys and list_keys[path] is None:
+        res.text = element.text
+        res.attrib.update((k, v) for k, v in element.attrib.items() if k.startswith("xmlns:"))
+    res.set(OPERATION, "remove")
+    return res
+
+def diff(base, applied, path, list_keys):
+    # the edits that turn the children of applied back into the ones of base: nodes that
+    # were created are removed and changed leaves get their previous value
+    res = []
+
+    for child in applied:
+        child_path = path + (local_name(child.tag),)
+        match = find_match(base, child, child_path, list_keys)
+
+        if match is None:
+            res.append(removal(child, child_path, list_keys))
+        elif len(child) == 0:
+            if len(match) == 0 and text(child) != text(match):
+                element = copy.deepcopy(match)
+                element.set(OPERATION, "replace")
+                res.append(element)
+        else:
+            changes = diff(match, child, child_path, list_keys)
+            if changes:
+                element = identity(child, list_keys.get(child_path))
+                element.extend(changes)
+                res.append(element)
+
+    return res
+
+def config(children):
+    element = ElementTree.Element("{" + NC_NS + "}config")
+    element.extend(children)
+    return ElementTree.tostring(element)
+
+# Brings the fuzzed datastore back to the state it had before the run after every case
+# that may have changed it. The candidate is reset with <discard-changes/>. Other
+# datastores get an edit-config that only undoes what the case changed, computed
+# against a snapshot of every top-level node taken before its first case. A node whose
+# snapshot failed is not restored at all, an empty snapshot would delete its config.
+class Restorer:
+    def __init__(self, datastore, capabilities):
+        self.datastore = datastore
+        self.discard = datastore == "candidate"
+        self.error_option = None
+        if any(c.startswith(ROLLBACK_ON_ERROR) for c in capabilities):
+            self.error_option = "rollback-on-error"
+        self.baselines = {}
+        self.restores = 0
+        self.fallbacks = 0
+        self.failed_snapshots = 0
+
+    def needed(self, reply):
+        # with rollback-on-error a rejected edit leaves nothing behind
+        return not (reply[0] == "rpc-error" and self.error_option is not None)
+
+    def needs_snapshot(self, root):
+        return not self.discard and root[0].tag not in self.baselines
+
+    def set_baseline(self, root, reply):
+        try:
+            data = next((e for e in parse_config(reply).iter() if local_name(e.tag) == "data"), None)
+        except ElementTree.ParseError:
+            data = None
+
+        # an rpc-error reply has no data element
+        if data is None:
+            self.snapshot_failed(root)
+            return
+        self.baselines[root[0].tag] = data
+
+    def snapshot_failed(self, root):
+        # not retried, later snapshots could already contain the changes of earlier cases
+        self.baselines[root[0].tag] = None
+        self.failed_snapshots += 1
+        print("snapshot of {} failed, its cases are not restored".format(local_name(root[0].tag)))
+
+    def restore_payload(self, node, root):
+        base = self.baselines.get(root[0].tag)
+        if base is None:
+            return None
+        changes = diff(base, root, (), getattr(node, "list_keys", {}))
+        return config(changes) if changes else None
+
+    def replace_payload(self, root):
+        # the whole top-level node, if the minimal edit was rejected
+        top = root[0]
+        base = next((e for e in self.baselines[top.tag] if e.tag == top.tag), None)
+        if base is None:
+            return config([removal(top, (), {})])
+
+        element = copy.deepcopy(base)
+        element.set(OPERATION, "replace")
+        return config([element])
+
+def parse_payload(data):
+    try:
+        root = parse_config(data)
+    except ElementTree.ParseError:
+        return None
+    return root if root is not None and len(root) > 0 else None
+
+def snapshot(manager, restorer, root):
+    if restorer.needs_snapshot(root):
+        try:
+            reply = manager.get_config(source=restorer.datastore, filter=("subtree", subtree_filter(root).decode()))
+        except (RPCError, TimeoutExpiredError, TransportError):
+            restorer.snapshot_failed(root)
+            return
+        restorer.set_baseline(root, reply.xml.encode())
+
+def restore(manager, restorer, node, root):
+    restorer.restores += 1
+    try:
+        if restorer.discard:
+            manager.discard_changes()
+            return
+
+        payload = restorer.restore_payload(node, root)
+        if payload is None:
+            return
+        try:
+            manager.edit_config(target=restorer.datastore, config=payload.decode())
+        except RPCError:
+            restorer.fallbacks += 1
+            manager.edit_config(target=restorer.datastore, config=restorer.replace_payload(root).decode())
+    except (RPCError, TimeoutExpiredError, TransportError):
+        # a lost session is noticed by the next case
+        pass
+
+async def snapshot_async(session, restorer, root):
+    if restorer.needs_snapshot(root):
+        try:
+            reply = await session.get_config(restorer.datastore, subtree_filter(root))
+        except (asyncio.TimeoutError, transport.TransportClosed, ConnectionError):
+            restorer.snapshot_failed(root)
+            return
+        restorer.set_baseline(root, reply)
+
+async def restore_async(session, restorer, node, root):
+    restorer.restores += 1
+    try:
+        if restorer.discard:
+            await session.discard_changes()
+            return
+
+        payload = restorer.restore_payload(node, root)
+        if payload is None:
+            return
+        reply = await session.edit_config(restorer.datastore, payload)
+        if reply[0] == "rpc-error":
+            restorer.fallbacks += 1
+            await session.edit_config(restorer.datastore, restorer.replace_payload(root))
+    except (asyncio.TimeoutError, transport.TransportClosed, ConnectionError):
+        pass
@@ -0,0 +1,142 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import bisect
+import decimal
+
+# share of the values taken from the edges of the intervals, and from just outside them
+edge_ratio = 0.2
+outside_ratio = 0.1
+
+def scaled(value, fraction_digits, rounding):
+    # decimal64 bounds as integers in units of the last fraction digit
+    return int((decimal.Decimal(value) * 10 ** fraction_digits).to_integral_value(rounding))
+
+def parse_intervals(expr, lower, upper, fraction_digits=None):
+    # "1..10 | 20 | 30..max", with min and max standing for the bounds of the type
+    intervals = []
+
+    if fraction_digits is None:
+        convert_lo = convert_hi = int
+    else:
+        convert_lo = lambda v: scaled(v, fraction_digits, decimal.ROUND_CEILING)
+        convert_hi = lambda v: scaled(v, fraction_digits, decimal.ROUND_FLOOR)
+
+    for part in expr.split("|"):
+        bounds = [b.strip() for b in part.split("..")]
+        lo = lower if bounds[0] == "min" else convert_lo(bounds[0])
+        if bounds[-1] == "max":
+            hi = max(upper, lo)
+        else:
+            hi = convert_hi(bounds[-1])
+        intervals.append((lo, hi))
+
+    return intervals
+
+def merge_intervals(intervals):
+    res = []
+
+    for lo, hi in sorted(i for i in intervals if i[0] <= i[1]):
+        if res and lo <= res[-1][1] + 1:
+            res[-1] = (res[-1][0], max(res[-1][1], hi))
+        else:
+            res.append((lo, hi))
+
+    return res
+
+# A normalized union of integer intervals. Values are drawn uniformly over the whole
+# union, except for a share that is taken from the edges of the intervals and from the
+# values right next to them, which a server has to reject.
+class IntervalSet:
+    def __init__(self, intervals, lower=None, upper=None):
+        self.intervals = merge_intervals(intervals)
+        self.lower = lower
+        self.upper = upper
+        self.key = None
+        if not self.intervals:
+            raise ValueError("empty interval set")
+
+        self.starts = []
+        self.total = 0
+        for lo, hi in self.intervals:
+            self.starts.append(self.total)
+            self.total += hi - lo + 1
+
+        edges = set()
+        outside = set()
+        for lo, hi in self.intervals:
+            edges.update(v for v in [lo, lo + 1, hi - 1, hi] if lo <= v <= hi)
+            outside.update([lo - 1, hi + 1])
+
+        # values outside of the type itself are not sent
+        self.edges = sorted(edges)
+        self.outside = sorted(v for v in outside if v not in self
+                and (lower is None or v >= lower) and (upper is None or v <= upper))
+
+    def __reduce__(self):
+        # unpickled sets go through the cache as well
+        if self.key is not None:
+            return get_intervals, self.key
+        return IntervalSet, (self.intervals, self.lower, self.upper)
+
+    @property
+    def min(self):
+        return self.intervals[0][0]
+
+    @property
+    def max(self):
+        return self.intervals[-1][1]
+
+    def __contains__(self, value):
+        i = bisect.bisect_right(self.intervals, (value, float("inf"))) - 1
+        return i >= 0 and self.intervals[i][0] <= value <= self.intervals[i][1]
+
+    def value_at(self, offset):
+        # the offset-th value of the union, in ascending order
+        i = bisect.bisect_right(self.starts, offset) - 1
+        return self.intervals[i][0] + offset - self.starts[i]
+
+    def offset_of(self, value):
+        i = bisect.bisect_right(self.intervals, (value, float("inf"))) - 1
+        return self.starts[i] + value - self.intervals[i][0]
+
+    def uniform(self, rng):
+        return self.value_at(rng.randrange(self.total))
+
+    def random_value(self, rng):
+        r = rng.random()
+        if r < edge_ratio:
+            return rng.choice(self.edges)
+        if r < edge_ratio + outside_ratio and self.outside:
+            return rng.choice(self.outside)
+        return self.uniform(rng)
+
+interval_sets = {}
+
+def get_intervals(expr, lower, upper, fraction_digits=None):
+    # shared by all leaves with the same restriction on the same type
+    key = (expr, lower, upper, fraction_digits)
+    intervals = interval_sets.get(key)
+    if intervals is None:
+        intervals = IntervalSet(parse_intervals(*key), lower, upper)
+        intervals.key = key
+        interval_sets[key] = intervals
+    return intervals
@@ -0,0 +1,148 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import argparse
+import collections
+import re
+import struct
+
+# An append-only log of fixed size case records. Payloads are not stored, they are
+# regenerated from the seed, the schema path and the mutation index. Schema paths and
+# reply classes are written once as string records and referenced by their id, which
+# is valid until the next run record.
+MAGIC = b"YIFLOG1\n"
+
+RUN = 1
+STRING = 2
+CASE = 3
+
+run_record = struct.Struct("<BQ")
+string_record = struct.Struct("<BIH")
+case_record = struct.Struct("<BQIIIf")
+
+buffer_size = 1 << 20
+
+Case = collections.namedtuple("Case", ["seed", "index", "path", "mutation", "reply_class", "latency"])
+
+class ResultLog:
+    def __init__(self, path, seed, paths=None):
+        self.f = open(path, "ab", buffering=buffer_size)
+        self.paths = paths or {}
+        self.strings = {}
+
+        if self.f.tell() == 0:
+            self.f.write(MAGIC)
+        self.f.write(run_record.pack(RUN, seed))
+
+    def register(self, nodes):
+        # schema paths of the leaves, looked up by the qualified names of their mutations
+        for node in nodes:
+            for item in node.walk():
+                self.paths[item.qualified_name] = getattr(item, "path", None) or item.qualified_name
+            yield node
+
+    def string_id(self, s):
+        string_id = self.strings.get(s)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings[s] = string_id
+            data = s.encode()
+            self.f.write(string_record.pack(STRING, string_id, len(data)))
+            self.f.write(data)
+        return string_id
+
+    def record(self, index, mutations, reply_class, latency):
+        class_id = self.string_id(reply_class)
+        for m in mutations:
+            path_id = self.string_id(self.paths.get(m.qualified_name, m.qualified_name))
+            self.f.write(case_record.pack(CASE, index, path_id, m.index, class_id, latency))
+
+    def close(self):
+        self.f.close()
+
+def read_log(path):
+    with open(path, "rb", buffering=buffer_size) as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a result log".format(path))
+
+        seed = None
+        strings = []
+
+        while True:
+            head = f.read(1)
+            if not head:
+                return
+
+            t = head[0]
+            if t == CASE:
+                data = head + f.read(case_record.size - 1)
+                if len(data) < case_record.size:
+                    # the last record of a log that is still being written
+                    return
+                _, index, path_id, mutation, class_id, latency = case_record.unpack(data)
+                yield Case(seed, index, strings[path_id], mutation, strings[class_id], latency)
+            elif t == STRING:
+                _, string_id, length = string_record.unpack(head + f.read(string_record.size - 1))
+                strings.append(f.read(length).decode())
+            elif t == RUN:
+                _, seed = run_record.unpack(head + f.read(run_record.size - 1))
+                strings = []
+            else:
+                raise ValueError("invalid record type {} in {}".format(t, path))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query the result logs written by the fuzzer with --log")
+    parser.add_argument('logs', nargs='+', help='Result log files')
+    parser.add_argument('--findings', dest='findings', action='store_true', help='Only show cases that timed out or lost the session')
+    parser.add_argument('--class', dest='reply_class', type=str, help='Regular expression the reply class has to match')
+    parser.add_argument('--path', dest='path', type=str, help='Regular expression the schema path has to match')
+    parser.add_argument('--min-latency', dest='min_latency', type=float, default=0.0, help='Only show cases slower than this many seconds')
+    parser.add_argument('--summary', dest='summary', action='store_true', help='Print the number of cases per schema path and reply class instead of the cases')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    class_re = re.compile(args.reply_class) if args.reply_class else None
+    path_re = re.compile(args.path) if args.path else None
+    summary = collections.Counter()
+
+    for log in args.logs:
+        for case in read_log(log):
+            if args.findings and case.reply_class not in ["timeout", "crash"]:
+                continue
+            if class_re is not None and not class_re.search(case.reply_class):
+                continue
+            if path_re is not None and not path_re.search(case.path):
+                continue
+            if case.latency < args.min_latency:
+                continue
+
+            if args.summary:
+                summary[case.path, case.reply_class] += 1
+            else:
+                print("seed {} case {} {} mutation {}: {} in {:.1f}ms".format(case.seed, case.index, case.path,
+                        case.mutation, case.reply_class, case.latency * 1000))
+
+    for (path, reply_class), count in sorted(summary.items()):
+        print("{} {}: {}".format(path, reply_class, count))
+
+if __name__ == "__main__":
+    main()
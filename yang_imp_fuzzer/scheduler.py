@@ -0,0 +1,213 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import heapq
+import re
+from boofuzz.mutation import Mutation
+from yang_imp_fuzzer import batch
+
+predicate_re = re.compile(r"\[[^\]]*\]")
+
+def reply_class(outcome, tag=None, app_tag=None, path=None):
+    if outcome != "rpc-error":
+        return outcome
+
+    # list keys in the error-path would make every entry a class of its own
+    path = predicate_re.sub("", path or "").strip()
+    return "rpc-error/{}/{}/{}".format((tag or "").strip(), (app_tag or "").strip(), path)
+
+def iter_cases(nodes, batch_size=1):
+    index = 0
+    for node in nodes:
+        for mutations in batch.iter_batches(node, batch_size):
+            yield index, node, mutations
+            index += 1
+
+def iter_worker_cases(nodes, worker_id, worker_count):
+    index = 0
+    for node in nodes:
+        for item in node.walk():
+            if not item.fuzzable:
+                continue
+
+            if not hasattr(item, "mutation"):
+                count = 0
+                for mutations in item.get_mutations():
+                    if (index + count) % worker_count == worker_id:
+                        yield index + count, node, mutations
+                    count += 1
+                index += count
+                continue
+
+            # values are regenerated from their index, so only this worker's share is computed
+            key = item.stream_key()
+            count = item.mutation_count()
+            for i in range((worker_id - index) % worker_count, count, worker_count):
+                yield index + i, node, [Mutation(item.mutation(i, key), item.qualified_name, i)]
+            index += count
+
+class SequentialScheduler:
+    def __init__(self, nodes, batch_size=1, worker_id=0, worker_count=1):
+        if batch_size <= 1:
+            self.pending = iter_worker_cases(nodes, worker_id, worker_count)
+        else:
+            self.pending = (case for case in iter_cases(nodes, batch_size) if case[0] % worker_count == worker_id)
+
+    def cases(self):
+        # resumes where the previous call stopped, every case is handed out once
+        yield from self.pending
+
+    def record(self, mutations, reply_class):
+        pass
+
+class Leaf:
+    def __init__(self, node, item, seq):
+        self.node = node
+        self.mutations = item.get_mutations()
+        self.seq = seq
+        self.classes = set()
+        self.sent = 0
+        self.since_new = 0
+        self.version = 0
+        self.done = False
+
+# Leaves are served in order of the number of cases sent since they last produced a
+# reply class they had not seen before, so productive leaves keep getting cases and a
+# leaf is retired once it has gone plateau cases without anything new.
+class CoverageScheduler:
+    def __init__(self, nodes, batch_size=1, worker_id=0, worker_count=1, plateau=64, window=None):
+        self.nodes = iter(nodes)
+        self.batch_size = batch_size
+        self.worker_id = worker_id
+        self.worker_count = worker_count
+        self.plateau = plateau
+        self.window = window
+        self.index = 0
+        self.seq = 0
+        self.leaves = {}
+        self.heap = []
+        self.node_heaps = {}
+
+        self.load()
+
+    def load(self):
+        # without a window all requests are scheduled at once, otherwise the next window
+        # is only loaded when the leaves of the previous one are done and then released
+        self.leaves = {name: leaf for name, leaf in self.leaves.items() if not leaf.done}
+        self.node_heaps = {key: heap for key, heap in self.node_heaps.items() if any(not e[3].done for e in heap)}
+        loaded = 0
+
+        for node in self.nodes:
+            for item in node.walk():
+                if not item.fuzzable:
+                    continue
+                if self.seq % self.worker_count == self.worker_id:
+                    leaf = Leaf(node, item, self.seq)
+                    self.leaves[item.qualified_name] = leaf
+                    self.push(leaf)
+                self.seq += 1
+
+            loaded += 1
+            if self.window is not None and loaded >= self.window:
+                break
+
+        return loaded
+
+    def push(self, leaf):
+        # stale heap entries are skipped by their version when popped
+        leaf.version += 1
+        entry = (leaf.since_new, leaf.seq, leaf.version, leaf)
+        heapq.heappush(self.heap, entry)
+        heapq.heappush(self.node_heaps.setdefault(id(leaf.node), []), entry)
+
+    def pop(self, heap, exclude=()):
+        skipped = []
+        res = None
+
+        while heap:
+            entry = heapq.heappop(heap)
+            leaf = entry[3]
+            if entry[2] != leaf.version or leaf.done:
+                continue
+            if leaf in exclude:
+                skipped.append(entry)
+                continue
+            res = leaf
+            break
+
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+
+        return res
+
+    def take(self, leaf):
+        mutations = next(leaf.mutations, None)
+        if mutations is None:
+            leaf.done = True
+            return None
+
+        leaf.sent += 1
+        leaf.since_new += 1
+        if leaf.since_new >= self.plateau:
+            leaf.done = True
+        else:
+            self.push(leaf)
+
+        return mutations
+
+    def cases(self):
+        while True:
+            leaf = self.pop(self.heap)
+            if leaf is None:
+                if self.load():
+                    continue
+                return
+
+            used = [leaf]
+            mutations = self.take(leaf)
+            if mutations is None:
+                continue
+
+            # a batch is rendered into one request, so it only takes leaves of the same node
+            node_heap = self.node_heaps[id(leaf.node)]
+            while len(used) < self.batch_size:
+                other = self.pop(node_heap, used)
+                if other is None:
+                    break
+                used.append(other)
+                other_mutations = self.take(other)
+                if other_mutations is not None:
+                    mutations = mutations + other_mutations
+
+            # spread over the workers, so merged reports keep unique case indices
+            yield self.index * self.worker_count + self.worker_id, leaf.node, mutations
+            self.index += 1
+
+    def record(self, mutations, reply_class):
+        for m in mutations:
+            leaf = self.leaves.get(m.qualified_name)
+            if leaf is None or reply_class in leaf.classes:
+                continue
+
+            leaf.classes.add(reply_class)
+            leaf.since_new = 0
+            leaf.done = False
+            self.push(leaf)
@@ -0,0 +1,137 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import fnmatch
+import re
+from yang_imp_fuzzer import yangsource
+
+glob_re = re.compile(r"[*?\[]")
+
+# state of a node whose whole subtree is selected
+SELECTED = "selected"
+
+class TrieNode:
+    def __init__(self, pattern=None):
+        self.pattern = pattern
+        self.children = {}
+        self.globs = []
+        self.deep = None
+        self.selected = False
+
+def split_path(path):
+    segments = []
+    module = None
+
+    # a segment only carries the module prefix where the module changes, like data_path()
+    for segment in path.strip("/").split("/"):
+        if ":" in segment:
+            prefix, name = segment.split(":", 1)
+            if prefix == module:
+                segment = name
+            module = prefix
+        segments.append(segment)
+
+    return segments
+
+def closure(nodes):
+    res = []
+    pending = list(nodes)
+
+    while pending:
+        node = pending.pop()
+        if node in res:
+            continue
+        res.append(node)
+        # ** also matches no segment at all
+        if node.deep is not None:
+            pending.append(node.deep)
+
+    return tuple(res)
+
+# The selected paths and globs are stored in a trie of path segments. The schema walk
+# keeps the set of trie nodes that match the path so far, and a subtree is pruned as
+# soon as that set is empty, without visiting any node below it.
+class Selector:
+    def __init__(self, patterns):
+        self.root = TrieNode()
+        self.regexes = []
+
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        for p in patterns:
+            if p.startswith("re:"):
+                self.regexes.append(re.compile(p[len("re:"):]))
+                continue
+
+            node = self.root
+            for segment in split_path(p):
+                node = self.add(node, segment)
+            node.selected = True
+
+        self.start = closure([self.root])
+
+    def add(self, node, segment):
+        if segment == "**":
+            if node.deep is None:
+                node.deep = TrieNode(segment)
+            return node.deep
+
+        if glob_re.search(segment):
+            for pattern, child in node.globs:
+                if pattern == segment:
+                    return child
+            child = TrieNode(segment)
+            node.globs.append((segment, child))
+            return child
+
+        return node.children.setdefault(segment, TrieNode(segment))
+
+    def step(self, state, path):
+        if state is SELECTED:
+            return SELECTED
+
+        # data paths of lists carry key predicates, like interface[name='%s']
+        path = yangsource.predicate_re.sub("", path)
+        segment = path[path.rfind("/") + 1:]
+        nodes = []
+
+        for node in state:
+            child = node.children.get(segment)
+            if child is not None:
+                nodes.append(child)
+            for pattern, child in node.globs:
+                if fnmatch.fnmatchcase(segment, pattern):
+                    nodes.append(child)
+            if node.pattern == "**":
+                nodes.append(node)
+
+        nodes = closure(nodes)
+        if any(node.selected for node in nodes):
+            return SELECTED
+
+        if self.regexes:
+            if any(r.search(path) for r in self.regexes):
+                return SELECTED
+            # a regular expression can match anywhere below, so nothing can be pruned
+            return nodes
+
+        return nodes or None
@@ -0,0 +1,86 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+# A request rendered once into a list of byte segments. Runs of static elements are
+# joined into one segment and every fuzzable leaf gets a slot holding its default
+# encoding, so a test case only encodes the mutated values and joins the segments.
+class Template:
+    def __init__(self, node):
+        self.parts = []
+        self.slots = {}
+        # schema paths of the leaves, for the latency histograms
+        self.paths = {}
+        # set by metrics.LatencyMetrics
+        self.latency_classes = None
+        static = []
+
+        for item in node.walk():
+            if not item.fuzzable:
+                static.append(item.render())
+                continue
+
+            if static:
+                self.parts.append(b"".join(static))
+                static = []
+            self.slots[item.qualified_name] = (len(self.parts), item)
+            self.paths[item.qualified_name] = getattr(item, "path", None) or item.qualified_name
+            self.parts.append(item.render())
+
+        if static:
+            self.parts.append(b"".join(static))
+
+    def render(self, mutations):
+        parts = self.parts.copy()
+        for m in mutations:
+            position, item = self.slots[m.qualified_name]
+            parts[position] = item.encode(m.value, None)
+        return b"".join(parts)
+
+    def streamed(self, mutations):
+        # whether a mutation renders a payload in chunks, like the entries of a list
+        for m in mutations:
+            item = self.slots[m.qualified_name][1]
+            if m.value and hasattr(item, "encode_chunks"):
+                return True
+        return False
+
+    def render_chunks(self, mutations):
+        parts = self.parts.copy()
+        for m in mutations:
+            position, item = self.slots[m.qualified_name]
+            if hasattr(item, "encode_chunks"):
+                parts[position] = item.encode_chunks(m.value)
+            else:
+                parts[position] = item.encode(m.value, None)
+
+        for part in parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from part
+
+def get_template(node):
+    # kept on the request, so it is released together with it
+    template = getattr(node, "yang_template", None)
+    if template is None:
+        template = Template(node)
+        node.yang_template = template
+    return template
@@ -0,0 +1,268 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import asyncio
+import itertools
+import re
+import time
+from xml.etree import ElementTree
+from yang_imp_fuzzer import scheduler
+
+BASE_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+BASE_1_0 = "urn:ietf:params:netconf:base:1.0"
+BASE_1_1 = "urn:ietf:params:netconf:base:1.1"
+EOM = b"]]>]]>"
+
+# largest NETCONF message the stream readers accept
+stream_limit = 2 ** 24
+
+HELLO = ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<hello xmlns=\"" + BASE_NS + "\"><capabilities>"
+        "<capability>" + BASE_1_0 + "</capability>"
+        "<capability>" + BASE_1_1 + "</capability>"
+        "</capabilities></hello>").encode()
+
+message_id_re = re.compile(rb'message-id="([^"]*)"')
+
+def error_field_re(name):
+    return re.compile(rb'<(?:\w+:)?' + name + rb'[^>]*>(.*?)</(?:\w+:)?' + name + rb'>', re.DOTALL)
+
+error_message_re = error_field_re(b"error-message")
+error_tag_re = error_field_re(b"error-tag")
+error_app_tag_re = error_field_re(b"error-app-tag")
+error_path_re = error_field_re(b"error-path")
+
+class TransportClosed(Exception):
+    pass
+
+class RPCFailed(Exception):
+    pass
+
+def frame(data, chunked):
+    if chunked:
+        return b"\n#" + str(len(data)).encode() + b"\n" + data + b"\n##\n"
+    return data + EOM
+
+async def read_message(reader, chunked):
+    try:
+        if not chunked:
+            return (await reader.readuntil(EOM))[:-len(EOM)]
+
+        chunks = []
+        while True:
+            header = await reader.readuntil(b"\n")
+            if header == b"\n":
+                continue
+            if header == b"##\n":
+                return b"".join(chunks)
+            if not header.startswith(b"#") or not header[1:-1].isdigit():
+                raise TransportClosed("invalid chunk header " + repr(header))
+            chunks.append(await reader.readexactly(int(header[1:])))
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError) as e:
+        raise TransportClosed(str(e))
+
+def error_field(regex, reply):
+    match = regex.search(reply)
+    return match.group(1).decode(errors="replace").strip() if match else None
+
+def classify_reply(reply):
+    if b"rpc-error>" not in reply:
+        return "ok", None, "ok"
+
+    reply_class = scheduler.reply_class("rpc-error", error_field(error_tag_re, reply),
+            error_field(error_app_tag_re, reply), error_field(error_path_re, reply))
+    return "rpc-error", error_field(error_message_re, reply), reply_class
+
+def parse_capabilities(hello):
+    root = ElementTree.fromstring(hello)
+    return [c.text.strip() for c in root.iter("{" + BASE_NS + "}capability") if c.text]
+
+class AsyncNETCONFSession:
+    def __init__(self, reader, writer, timeout=30, close_callback=None):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.close_callback = close_callback
+        self.chunked = False
+        self.capabilities = []
+        self.closed = False
+        self.message_id = 0
+        self.pending = {}
+        self.reader_task = None
+        # a streamed message yields to the event loop, other RPCs must not be written into it
+        self.write_lock = asyncio.Lock()
+
+    async def hello(self):
+        self.writer.write(frame(HELLO, False))
+        server_hello = await read_message(self.reader, False)
+        self.capabilities = parse_capabilities(server_hello)
+        self.chunked = BASE_1_1 in self.capabilities
+        self.reader_task = asyncio.ensure_future(self.read_replies())
+
+    async def read_replies(self):
+        try:
+            while True:
+                reply = await read_message(self.reader, self.chunked)
+                match = message_id_re.search(reply, 0, 512)
+                future = self.pending.pop(match.group(1).decode(), None) if match else None
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except TransportClosed as e:
+            # after a framing error the stream cannot be resynchronized
+            self.fail_pending(e)
+            self.writer.close()
+        except asyncio.CancelledError:
+            self.fail_pending(TransportClosed("session closed"))
+
+    def fail_pending(self, error):
+        self.closed = True
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+    async def write_message(self, parts):
+        # every part goes out as a chunk of its own, or as is with end-of-message framing
+        async with self.write_lock:
+            for part in parts:
+                if not part:
+                    continue
+                if self.chunked:
+                    self.writer.write(b"\n#" + str(len(part)).encode() + b"\n")
+                self.writer.write(part)
+                await self.writer.drain()
+            self.writer.write(b"\n##\n" if self.chunked else EOM)
+            await self.writer.drain()
+
+    async def rpc(self, operation):
+        if self.closed:
+            raise TransportClosed("session closed")
+
+        self.message_id += 1
+        message_id = str(self.message_id)
+        future = asyncio.get_event_loop().create_future()
+        self.pending[message_id] = future
+
+        start = b"<rpc message-id=\"" + message_id.encode() + b"\" xmlns=\"" + BASE_NS.encode() + b"\">"
+        if isinstance(operation, bytes):
+            async with self.write_lock:
+                self.writer.write(frame(start + operation + b"</rpc>", self.chunked))
+                await self.writer.drain()
+        else:
+            await self.write_message(itertools.chain([start], operation, [b"</rpc>"]))
+
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.pending.pop(message_id, None)
+
+    async def edit_config(self, datastore, config, error_option=None):
+        # config is either bytes or an iterable of byte chunks that is streamed
+        head = b"<edit-config><target><" + datastore.encode() + b"/></target>"
+        if error_option is not None:
+            head += b"<error-option>" + error_option.encode() + b"</error-option>"
+        if isinstance(config, bytes):
+            operation = head + config + b"</edit-config>"
+        else:
+            operation = itertools.chain([head], config, [b"</edit-config>"])
+        start = time.perf_counter()
+        try:
+            reply = await self.rpc(operation)
+        except asyncio.TimeoutError:
+            return "error", "timeout", "timeout", time.perf_counter() - start
+        except (TransportClosed, ConnectionError) as e:
+            return "error", str(e), "crash", time.perf_counter() - start
+
+        return classify_reply(reply) + (time.perf_counter() - start,)
+
+    async def get_config(self, source, subtree):
+        # the raw reply, subtree is the content of a subtree filter
+        return await self.rpc(b"<get-config><source><" + source.encode() + b"/></source>"
+                + b"<filter type=\"subtree\">" + subtree + b"</filter></get-config>")
+
+    async def discard_changes(self):
+        return classify_reply(await self.rpc(b"<discard-changes/>"))
+
+    async def close(self):
+        if not self.closed:
+            try:
+                await asyncio.wait_for(self.rpc(b"<close-session/>"), 1)
+            except (asyncio.TimeoutError, TransportClosed, ConnectionError):
+                pass
+        self.closed = True
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+        self.writer.close()
+        if self.close_callback is not None:
+            self.close_callback()
+
+async def connect_tcp(host, port, timeout=30):
+    reader, writer = await asyncio.open_connection(host, port, limit=stream_limit)
+    session = AsyncNETCONFSession(reader, writer, timeout)
+    await session.hello()
+    return session
+
+async def connect_ssh(host, port, username, password, timeout=30):
+    import asyncssh
+
+    # errors of the SSH layer are reported like those of the NETCONF session
+    try:
+        conn = await asyncssh.connect(host, port, username=username, password=password, known_hosts=None)
+    except asyncssh.Error as e:
+        raise TransportClosed(str(e))
+    try:
+        writer, reader, _ = await conn.open_session(subsystem="netconf", encoding=None)
+    except asyncssh.Error as e:
+        conn.close()
+        raise TransportClosed(str(e))
+    session = AsyncNETCONFSession(reader, writer, timeout, close_callback=conn.close)
+    await session.hello()
+    return session
+
+async def connect(args):
+    if args.transport == "tcp":
+        return await connect_tcp(args.ip, args.port, args.rpc_timeout)
+    return await connect_ssh(args.ip, args.port, args.user, args.password, args.rpc_timeout)
+
+class Reply:
+    def __init__(self, xml):
+        self.xml = xml
+
+# The calls of an ncclient manager that are needed to build the requests, over the
+# asyncio transport, for servers that are only reached with --transport tcp.
+class SyncSession:
+    def __init__(self, args):
+        self.loop = asyncio.new_event_loop()
+        self.session = self.loop.run_until_complete(connect(args))
+        self.server_capabilities = self.session.capabilities
+
+    def get(self, filter):
+        reply = self.loop.run_until_complete(self.session.rpc(b"<get>" + filter.encode() + b"</get>"))
+        outcome, message, _ = classify_reply(reply)
+        if outcome == "rpc-error":
+            raise RPCFailed(message)
+        return Reply(reply.decode())
+
+    def close(self):
+        try:
+            self.loop.run_until_complete(self.session.close())
+        finally:
+            self.loop.close()
@@ -0,0 +1,157 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import functools
+import hashlib
+import os
+import pickle
+import re
+
+# bump when the layout of the cached trees changes in a way the source hash does not catch
+cache_format = 5
+
+import_re = re.compile(r'^\s*(?:import|include)\s+"?([\w\-.]+)"?', re.MULTILINE)
+
+def default_cache_dir():
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "yang-imp-fuzzer")
+
+def index_modules(modules_dir):
+    index = {}
+
+    for directory in modules_dir.split(":"):
+        for root, dirs, files in os.walk(directory):
+            for f in sorted(files):
+                if not f.endswith(".yang"):
+                    continue
+                name = f[:-len(".yang")].split("@")[0]
+                # keep the newest revision, which sorts last
+                index[name] = os.path.join(root, f)
+
+    return index
+
+def module_files(modules_dir, module_name, index=None):
+    if index is None:
+        index = index_modules(modules_dir)
+    files = []
+    seen = set()
+    pending = [module_name]
+
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+
+        # modules built into libyang are not on disk
+        if name not in index:
+            continue
+
+        with open(index[name], "rb") as f:
+            data = f.read()
+        files.append((name, index[name], data))
+        pending.extend(import_re.findall(data.decode(errors="replace")))
+
+    return files
+
+@functools.lru_cache(maxsize=None)
+def source_digest():
+    h = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+
+    for f in sorted(os.listdir(package_dir)):
+        if f.endswith(".py"):
+            with open(os.path.join(package_dir, f), "rb") as source:
+                h.update(source.read())
+
+    return h.digest()
+
+def cache_key(files, features, fuzz_xpath, namespace, max_list_entries=4096):
+    h = hashlib.sha256()
+    h.update(str(cache_format).encode())
+    h.update(source_digest())
+
+    for name, path, data in sorted(files):
+        h.update(name.encode())
+        h.update(hashlib.sha256(data).digest())
+
+    h.update(repr((sorted(features), fuzz_xpath, namespace, max_list_entries)).encode())
+
+    return h.hexdigest()
+
+class TreeCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".pickle")
+
+    def open(self, key):
+        try:
+            return open(self.path(key), "rb")
+        except OSError:
+            return None
+
+    def iter_nodes(self, f):
+        # one pickle per request, so that requests can be loaded one at a time
+        with f:
+            while True:
+                node = pickle.load(f)
+                if node is None:
+                    return
+                yield node
+
+    def load(self, key):
+        f = self.open(key)
+        if f is None:
+            return None
+
+        try:
+            return list(self.iter_nodes(f))
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def load_lazy(self, key):
+        f = self.open(key)
+        if f is None:
+            return None
+        return self.iter_nodes(f)
+
+    def store(self, key, nodes):
+        for _ in self.store_lazy(key, nodes):
+            pass
+
+    def store_lazy(self, key, nodes):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.path(key) + ".{}.tmp".format(os.getpid())
+        complete = False
+
+        try:
+            with open(tmp_path, "wb") as f:
+                for node in nodes:
+                    pickle.dump(node, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    yield node
+                pickle.dump(None, f)
+            os.replace(tmp_path, self.path(key))
+            complete = True
+        finally:
+            # a run that stops early leaves no partial tree behind
+            if not complete and os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,351 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import asyncio
+import boofuzz
+import json
+import multiprocessing
+import time
+from ncclient.operations import RPCError, TimeoutExpiredError
+from ncclient.transport import TransportError
+from yang_imp_fuzzer import batch
+from yang_imp_fuzzer import dedup
+from yang_imp_fuzzer import metrics
+from yang_imp_fuzzer import oracle
+from yang_imp_fuzzer import randomstream
+from yang_imp_fuzzer import restore
+from yang_imp_fuzzer import resultlog
+from yang_imp_fuzzer import scheduler
+from yang_imp_fuzzer import template
+from yang_imp_fuzzer import transport
+
+OUTCOMES = ["ok", "rpc-error", "error"]
+
+class ServerDown(Exception):
+    pass
+
+def send_case(conn, data, error_option=None):
+    start = time.perf_counter()
+    try:
+        if error_option is None:
+            conn.send(data)
+        else:
+            conn.get_raw_conn().edit_config(target=conn.datastore, config=data.decode(), error_option=error_option)
+    except RPCError as e:
+        return "rpc-error", e.message, scheduler.reply_class("rpc-error", e.tag, e.app_tag, e.path), time.perf_counter() - start
+    except TimeoutExpiredError as e:
+        return "error", str(e), "timeout", time.perf_counter() - start
+    except TransportError as e:
+        return "error", str(e), "crash", time.perf_counter() - start
+
+    return "ok", None, "ok", time.perf_counter() - start
+
+def new_report():
+    return {"cases": 0, "rpcs": 0, "dedup_hits": 0, "restores": 0, "elapsed": 0.0, "requests": {}, "classes": {}, "findings": [],
+            "latency": {}, "oracle": {}}
+
+def record_case(report, name, outcome):
+    counts = report["requests"].setdefault(name, dict.fromkeys(OUTCOMES, 0))
+    counts[outcome] += 1
+    report["cases"] += 1
+
+def merge_reports(reports):
+    merged = new_report()
+    latency = metrics.LatencyMetrics()
+
+    for report in reports:
+        merged["cases"] += report["cases"]
+        merged["rpcs"] += report["rpcs"]
+        merged["dedup_hits"] += report["dedup_hits"]
+        merged["restores"] += report["restores"]
+        merged["elapsed"] = max(merged["elapsed"], report["elapsed"])
+        merged["findings"].extend(report["findings"])
+        latency.merge_report(report["latency"])
+        for name, count in report["oracle"].items():
+            merged["oracle"][name] = merged["oracle"].get(name, 0) + count
+        for reply_class, count in report["classes"].items():
+            merged["classes"][reply_class] = merged["classes"].get(reply_class, 0) + count
+        for name, counts in report["requests"].items():
+            merged_counts = merged["requests"].setdefault(name, dict.fromkeys(OUTCOMES, 0))
+            for outcome in OUTCOMES:
+                merged_counts[outcome] += counts[outcome]
+
+    merged["findings"].sort(key=lambda f: f["index"])
+    merged["latency"] = latency.to_report()
+    return merged
+
+def record_sent(report, cases, log, index, node, worker_id, sent, data, reply, latencies=None):
+    outcome, reason, reply_class, latency = reply
+    report["rpcs"] += 1
+
+    # rejected batches are bisected, only their parts get a verdict
+    if outcome == "rpc-error" and len(sent) > 1:
+        return
+
+    if latencies is not None:
+        latencies.record(template.get_template(node), sent, reply_class, latency)
+
+    for _ in sent:
+        record_case(report, node.name, outcome)
+    report["classes"][reply_class] = report["classes"].get(reply_class, 0) + len(sent)
+    cases.record(sent, reply_class)
+    if log is not None:
+        log.record(index, sent, reply_class, latency)
+
+    if outcome == "error":
+        report["findings"].append({"index": index, "request": node.name, "worker": worker_id,
+                "mutations": [[m.qualified_name, m.index] for m in sent], "reason": reason, "payload": data.decode() if data is not None else None})
+    elif isinstance(cases, oracle.Oracle):
+        disagreement = cases.disagreement(node, sent, outcome, reason)
+        if disagreement is not None:
+            report["findings"].append({"index": index, "request": node.name, "worker": worker_id,
+                    "mutations": [[m.qualified_name, m.index] for m in sent], "reason": disagreement[1],
+                    "payload": data.decode() if data is not None else None, "oracle": disagreement[0]})
+
+def record_server_down(report, args, index, node, worker_id):
+    # the run ends here, the findings so far are kept
+    print("worker {}: server did not accept sessions within {}s after case {}".format(worker_id, args.recovery_timeout, index))
+    report["findings"].append({"index": index, "request": node.name, "worker": worker_id, "mutations": [],
+            "reason": "server did not accept sessions within {}s".format(args.recovery_timeout), "payload": None, "down": True})
+
+def reconnect(conn, args):
+    deadline = time.monotonic() + args.recovery_timeout
+    while True:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        try:
+            conn.open()
+            return
+        except Exception:
+            # whatever keeps the session from being set up counts as down
+            if time.monotonic() > deadline:
+                raise ServerDown()
+        time.sleep(1)
+
+async def reconnect_async(args):
+    deadline = time.monotonic() + args.recovery_timeout
+    while True:
+        try:
+            return await asyncio.wait_for(transport.connect(args), args.rpc_timeout)
+        except Exception:
+            if time.monotonic() > deadline:
+                raise ServerDown()
+        await asyncio.sleep(1)
+
+def fuzz_cases(args, cases, report, log, worker_id, latencies=None):
+    conn = boofuzz.NETCONFConnection(args.ip, args.port, args.user, args.password, args.datastore, False)
+    conn.open()
+    restorer = None
+    if args.restore:
+        restorer = restore.Restorer(args.datastore, conn.get_raw_conn().server_capabilities)
+
+    # called by send_batch within the loop below, node is the request of the current case
+    def send(data):
+        if restorer is None:
+            return send_case(conn, data)
+
+        root = restore.parse_payload(data)
+        if root is not None:
+            restore.snapshot(conn.get_raw_conn(), restorer, root)
+        reply = send_case(conn, data, restorer.error_option)
+        if root is not None and reply[0] != "error" and restorer.needed(reply):
+            restore.restore(conn.get_raw_conn(), restorer, node, root)
+        return reply
+
+    for index, node, mutations in cases.cases():
+        for sent, data, reply in batch.send_batch(send, node, mutations):
+            record_sent(report, cases, log, index, node, worker_id, sent, data, reply, latencies)
+
+            if reply[0] == "error":
+                # the session is most likely gone, reconnect before the next case
+                try:
+                    reconnect(conn, args)
+                except ServerDown:
+                    record_server_down(report, args, index, node, worker_id)
+                    if restorer is not None:
+                        report["restores"] = restorer.restores
+                    return
+
+                # a case that timed out may still have been applied
+                root = restore.parse_payload(data) if restorer is not None else None
+                if root is not None:
+                    restore.restore(conn.get_raw_conn(), restorer, node, root)
+
+    conn.close()
+    if restorer is not None:
+        report["restores"] = restorer.restores
+
+async def fuzz_cases_pipelined(args, cases, report, log, worker_id, latencies=None):
+    session = await transport.connect(args)
+    window = asyncio.Semaphore(args.pipeline)
+    tasks = set()
+    restorer = None
+    if args.restore:
+        restorer = restore.Restorer(args.datastore, session.capabilities)
+
+    async def run(index, node, mutations, session):
+        try:
+            for sent, data, reply in await batch.send_batch_async(session, args.datastore, node, mutations, restorer):
+                record_sent(report, cases, log, index, node, worker_id, sent, data, reply, latencies)
+        finally:
+            window.release()
+
+    # replies still in flight when the scheduler runs dry can hand out more cases
+    sent = True
+    down = False
+    while sent and not down:
+        sent = False
+        for index, node, mutations in cases.cases():
+            sent = True
+            await window.acquire()
+            if session.closed:
+                await session.close()
+                try:
+                    session = await reconnect_async(args)
+                except ServerDown:
+                    record_server_down(report, args, index, node, worker_id)
+                    down = True
+                    break
+
+            task = asyncio.ensure_future(run(index, node, mutations, session))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*list(tasks))
+    await session.close()
+
+    if restorer is not None:
+        report["restores"] = restorer.restores
+
+def fuzz_worker(args, nodes, worker_id, worker_count):
+    randomstream.set_run_seed(args.seed)
+
+    if nodes is None:
+        from yang_imp_fuzzer.fuzzer import build_requests
+        nodes = build_requests(args)
+
+    log = None
+    if args.log is not None:
+        path = args.log if worker_count == 1 else "{}.{}".format(args.log, worker_id)
+        log = resultlog.ResultLog(path, args.seed)
+        nodes = log.register(nodes)
+
+    if args.schedule == "coverage":
+        # with lazy requests, only one request at a time is scheduled
+        window = 1 if args.lazy else None
+        cases = scheduler.CoverageScheduler(nodes, args.batch_size, worker_id, worker_count, args.plateau, window)
+    else:
+        cases = scheduler.SequentialScheduler(nodes, args.batch_size, worker_id, worker_count)
+
+    if args.dedup_size > 0:
+        cases = dedup.Deduplicator(cases, args.dedup_size << 20)
+    if args.oracle:
+        cases = oracle.Oracle(cases, args.modules_dir, args.oracle_threads, args.oracle_batch, args.oracle_sample_invalid)
+
+    report = new_report()
+    latencies = metrics.LatencyMetrics()
+    server = None
+    if args.metrics_port is not None:
+        # every worker serves its own histograms, on the port after the one of the previous worker
+        server = metrics.serve(latencies, args.metrics_port + worker_id)
+    start = time.monotonic()
+
+    # ncclient only speaks SSH
+    if args.pipeline > 1 or args.transport == "tcp":
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(fuzz_cases_pipelined(args, cases, report, log, worker_id, latencies))
+        loop.close()
+    else:
+        fuzz_cases(args, cases, report, log, worker_id, latencies)
+
+    report["elapsed"] = time.monotonic() - start
+    report["latency"] = latencies.to_report()
+    if server is not None:
+        server.shutdown()
+    if isinstance(cases, oracle.Oracle):
+        cases.close()
+        report["oracle"] = cases.counts
+        cases = cases.scheduler
+    if isinstance(cases, dedup.Deduplicator):
+        report["dedup_hits"] = cases.hits
+    if log is not None:
+        log.close()
+
+    return report
+
+def print_report(report, worker_count):
+    for name, counts in sorted(report["requests"].items()):
+        print("request {}: {} ok, {} rpc-error, {} error".format(name, counts["ok"], counts["rpc-error"], counts["error"]))
+
+    for finding in report["findings"]:
+        print("case {} ({}, worker {}): {}".format(finding["index"], finding["request"], finding["worker"], finding["reason"]))
+
+    for reply_class, count in sorted(report["classes"].items(), key=lambda c: -c[1]):
+        print("reply class {}: {}".format(reply_class, count))
+
+    if report["dedup_hits"]:
+        print("{} values skipped as already sent".format(report["dedup_hits"]))
+    if report["restores"]:
+        print("datastore restored {} times".format(report["restores"]))
+    if report["oracle"]:
+        counts = report["oracle"]
+        print("libyang: {} valid, {} invalid, {} unknown, {} cache hits, {} invalid cases not sent".format(counts["valid"],
+                counts["invalid"], counts["unknown"], counts["cache hits"], counts["skipped"]))
+        print("server disagrees with libyang: {} accepted invalid, {} rejected valid".format(counts["accepted-invalid"],
+                counts["rejected-valid"]))
+
+    latencies = metrics.LatencyMetrics()
+    latencies.merge_report(report["latency"])
+    for p99, path, reply_class, count in latencies.slowest():
+        print("p99 {:.1f} ms for {} ({}, {} cases)".format(p99 * 1000, path, reply_class, count))
+
+    rate = report["cases"] / report["elapsed"] if report["elapsed"] else 0.0
+    print("{} cases in {} RPCs and {:.1f}s ({:.1f} cases/s) using {} workers".format(report["cases"], report["rpcs"],
+            report["elapsed"], rate, worker_count))
+
+def fuzz_parallel(args):
+    from yang_imp_fuzzer.fuzzer import build_requests
+
+    # the models are parsed once, the workers get the finished requests. Lazy requests
+    # cannot be handed over, so every worker builds them on its own.
+    nodes = None
+    if not args.lazy:
+        nodes = build_requests(args)
+
+    if args.workers == 1:
+        reports = [fuzz_worker(args, nodes, 0, 1)]
+    else:
+        jobs = [(args, nodes, worker_id, args.workers) for worker_id in range(args.workers)]
+        with multiprocessing.Pool(args.workers) as pool:
+            reports = pool.starmap(fuzz_worker, jobs)
+
+    report = merge_reports(reports)
+    report["seed"] = args.seed
+    print_report(report, args.workers)
+
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return report
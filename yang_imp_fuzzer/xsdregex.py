@@ -0,0 +1,317 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import random
+import re
+import string
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+# character ranges used for the XSD escapes that python's re does not know
+xsd_categories = {
+    "L": "a-zA-Z",
+    "Lu": "A-Z",
+    "Ll": "a-z",
+    "N": "0-9",
+    "Nd": "0-9",
+    "IsBasicLatin": "\\x20-\\x7e",
+}
+
+xsd_escapes = {
+    "i": "a-zA-Z_:",
+    "c": "a-zA-Z0-9._:\\-",
+}
+
+printable = "".join(c for c in string.printable if c not in "\t\n\r\x0b\x0c")
+
+category_chars = {
+    sre_constants.CATEGORY_DIGIT: string.digits,
+    sre_constants.CATEGORY_NOT_DIGIT: "".join(c for c in printable if c not in string.digits),
+    sre_constants.CATEGORY_SPACE: " ",
+    sre_constants.CATEGORY_NOT_SPACE: printable.replace(" ", ""),
+    sre_constants.CATEGORY_WORD: string.ascii_letters + string.digits + "_",
+    sre_constants.CATEGORY_NOT_WORD: "".join(c for c in printable if not (c.isalnum() or c == "_")),
+}
+
+repeat_ops = tuple(getattr(sre_constants, op) for op in ["MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"] if hasattr(sre_constants, op))
+
+# used as the length of unbounded repetitions when no upper length bound is given
+unbounded_len = 100
+
+def translate_pattern(pattern):
+    res = []
+    in_class = False
+    i = 0
+
+    while i < len(pattern):
+        c = pattern[i]
+
+        if c == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped in "pP" and i + 2 < len(pattern) and pattern[i + 2] == "{":
+                end = pattern.index("}", i)
+                chars = xsd_categories.get(pattern[i + 3:end], "a-zA-Z0-9")
+                if in_class:
+                    # negated categories can not be expressed inside a class
+                    if escaped == "p":
+                        res.append(chars)
+                elif escaped == "p":
+                    res.append("[" + chars + "]")
+                else:
+                    res.append("[^" + chars + "]")
+                i = end + 1
+                continue
+            elif escaped in xsd_escapes:
+                if in_class:
+                    res.append(xsd_escapes[escaped])
+                else:
+                    res.append("[" + xsd_escapes[escaped] + "]")
+            else:
+                res.append(c + escaped)
+            i += 2
+            continue
+
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c in "^$" and not in_class:
+            # XSD regular expressions have no anchors
+            c = "\\" + c
+
+        res.append(c)
+        i += 1
+
+    return "".join(res)
+
+def add_len(a, b):
+    if a is None or b is None:
+        return None
+    return a + b
+
+def clamp(value, min_val, max_val):
+    if max_val is not None and value > max_val:
+        value = max_val
+    return max(value, min_val)
+
+class Chars:
+    def __init__(self, chars):
+        self.chars = chars
+        self.min_len = 1
+        self.max_len = 1
+
+    def generate(self, rng, target):
+        return rng.choice(self.chars)
+
+class Sequence:
+    def __init__(self, items):
+        self.items = items
+        self.min_len = 0
+        self.max_len = 0
+        self.rest = []
+
+        for item in reversed(items):
+            self.rest.append((self.min_len, self.max_len))
+            self.min_len += item.min_len
+            self.max_len = add_len(self.max_len, item.max_len)
+        self.rest.reverse()
+
+    def generate(self, rng, target):
+        res = []
+        length = 0
+
+        for item, (rest_min, rest_max) in zip(self.items, self.rest):
+            want = target - length
+            lo = item.min_len if rest_max is None else max(item.min_len, want - rest_max)
+            hi = want - rest_min if item.max_len is None else min(item.max_len, want - rest_min)
+            if lo <= hi:
+                item_target = rng.randint(lo, hi)
+            else:
+                item_target = clamp(hi, item.min_len, item.max_len)
+
+            value = item.generate(rng, item_target)
+            length += len(value)
+            res.append(value)
+
+        return "".join(res)
+
+class Branch:
+    def __init__(self, branches):
+        self.branches = branches
+        self.min_len = min(b.min_len for b in branches)
+        self.max_len = 0
+        for b in branches:
+            if b.max_len is None:
+                self.max_len = None
+                break
+            self.max_len = max(self.max_len, b.max_len)
+
+    def generate(self, rng, target):
+        fitting = [b for b in self.branches if b.min_len <= target and (b.max_len is None or b.max_len >= target)]
+        if fitting:
+            return rng.choice(fitting).generate(rng, target)
+
+        branch = min(self.branches, key=lambda b: abs(clamp(target, b.min_len, b.max_len) - target))
+        return branch.generate(rng, clamp(target, branch.min_len, branch.max_len))
+
+class Repeat:
+    def __init__(self, item, min_count, max_count):
+        self.item = item
+        self.min_count = min_count
+        self.max_count = max_count
+        self.min_len = min_count * item.min_len
+
+        if item.max_len == 0 or max_count == 0:
+            self.max_len = 0
+        elif item.max_len is None or max_count is None:
+            self.max_len = None
+        else:
+            self.max_len = max_count * item.max_len
+
+    def generate(self, rng, target):
+        item = self.item
+        if self.max_len == 0:
+            return ""
+
+        lo = self.min_count
+        hi = self.max_count
+        if item.max_len:
+            lo = max(lo, -(-target // item.max_len))
+        if item.min_len:
+            hi = target // item.min_len if hi is None else min(hi, target // item.min_len)
+        elif hi is None:
+            hi = max(lo, target)
+
+        if lo <= hi:
+            count = rng.randint(lo, hi)
+        else:
+            count = clamp(rng.choice([lo, hi]), self.min_count, self.max_count)
+
+        if isinstance(item, Chars):
+            return "".join(rng.choices(item.chars, k=count))
+
+        res = []
+        length = 0
+        for i in range(count):
+            left = count - i - 1
+            want = target - length
+            item_lo = item.min_len if item.max_len is None else max(item.min_len, want - left * item.max_len)
+            item_hi = want - left * item.min_len if item.max_len is None else min(item.max_len, want - left * item.min_len)
+            if item_lo <= item_hi:
+                item_target = rng.randint(item_lo, item_hi)
+            else:
+                item_target = clamp(item_hi, item.min_len, item.max_len)
+
+            value = item.generate(rng, item_target)
+            length += len(value)
+            res.append(value)
+
+        return "".join(res)
+
+def class_chars(items):
+    chars = set()
+    negate = False
+
+    for op, av in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op == sre_constants.RANGE:
+            chars.update(chr(c) for c in range(av[0], av[1] + 1))
+        elif op == sre_constants.CATEGORY:
+            chars.update(category_chars.get(av, ""))
+
+    if negate:
+        return "".join(c for c in printable if c not in chars)
+    return "".join(sorted(chars))
+
+def build(parsed):
+    items = []
+
+    for op, av in parsed:
+        if op == sre_constants.LITERAL:
+            items.append(Chars(chr(av)))
+        elif op == sre_constants.NOT_LITERAL:
+            items.append(Chars(printable.replace(chr(av), "")))
+        elif op == sre_constants.ANY:
+            items.append(Chars(printable))
+        elif op == sre_constants.IN:
+            items.append(Chars(class_chars(av)))
+        elif op == sre_constants.BRANCH:
+            items.append(Branch([build(b) for b in av[1]]))
+        elif op == sre_constants.SUBPATTERN:
+            items.append(build(av[-1]))
+        elif op in repeat_ops:
+            max_count = None if av[1] == sre_constants.MAXREPEAT else av[1]
+            items.append(Repeat(build(av[2]), av[0], max_count))
+        # anchors, assertions and group references do not occur in XSD patterns and generate nothing
+
+    if len(items) == 1:
+        return items[0]
+    return Sequence(items)
+
+class CompiledPattern:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.translated = translate_pattern(pattern)
+        self.regex = re.compile(self.translated)
+        self.tree = build(sre_parse.parse(self.translated))
+        self.min_len = self.tree.min_len
+        self.max_len = self.tree.max_len
+
+    def __reduce__(self):
+        # unpickled patterns go through the cache as well
+        return compile_pattern, (self.pattern,)
+
+    def match(self, value):
+        return self.regex.fullmatch(value) is not None
+
+    def generate(self, min_len=0, max_len=None, rng=random, attempts=10):
+        lo = max(int(min_len), self.min_len)
+        hi = self.max_len
+        if max_len is not None:
+            hi = int(max_len) if hi is None else min(int(max_len), hi)
+        if hi is None:
+            hi = lo + unbounded_len
+
+        value = None
+        for _ in range(attempts):
+            target = rng.randint(lo, hi) if lo <= hi else lo
+            value = self.tree.generate(rng, target)
+            if len(value) >= int(min_len) and (max_len is None or len(value) <= int(max_len)) and self.match(value):
+                break
+
+        return value
+
+compiled_patterns = {}
+
+def compile_pattern(pattern):
+    compiled = compiled_patterns.get(pattern)
+    if compiled is None:
+        compiled = CompiledPattern(pattern)
+        compiled_patterns[pattern] = compiled
+    return compiled
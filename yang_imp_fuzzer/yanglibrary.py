@@ -0,0 +1,132 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import hashlib
+import io
+import json
+import os
+from ncclient.operations import RPCError
+from urllib.parse import parse_qs, urlsplit
+from xml.etree import ElementTree
+from yang_imp_fuzzer import transport
+
+YANG_LIBRARY_NS = "urn:ietf:params:xml:ns:yang:ietf-yang-library"
+
+# both the RFC 8525 yang-library and the older RFC 7895 modules-state, in one get
+library_filter = ("<filter type=\"subtree\" xmlns=\"urn:ietf:params:xml:ns:netconf:base:1.0\">"
+        "<yang-library xmlns=\"" + YANG_LIBRARY_NS + "\"/>"
+        "<modules-state xmlns=\"" + YANG_LIBRARY_NS + "\"/>"
+        "</filter>")
+
+module_tag = "{" + YANG_LIBRARY_NS + "}module"
+name_tag = "{" + YANG_LIBRARY_NS + "}name"
+feature_tag = "{" + YANG_LIBRARY_NS + "}feature"
+
+def parse_capability(capability):
+    query = parse_qs(urlsplit(capability).query)
+    if "module" not in query:
+        return None, []
+
+    features = []
+    for f in query.get("features", []):
+        features.extend(f.split(","))
+
+    return query["module"][0], features
+
+def parse_library(xml):
+    modules = {}
+
+    for event, element in ElementTree.iterparse(io.BytesIO(xml), events=["end"]):
+        if element.tag != module_tag:
+            continue
+
+        name = element.findtext(name_tag)
+        if name is not None:
+            features = modules.setdefault(name, [])
+            features.extend(f.text for f in element.findall(feature_tag) if f.text and f.text not in features)
+        element.clear()
+
+    return modules
+
+class FeatureIndex:
+    def __init__(self, capabilities, conn, cache_dir=None):
+        self.conn = conn
+        self.modules = {}
+        self.library = None
+        self.path = None
+
+        capabilities = list(capabilities)
+        for c in capabilities:
+            name, features = parse_capability(c)
+            if name is not None:
+                self.modules[name] = features
+
+        if cache_dir is not None:
+            # the hello carries the yang-library content-id, so changed servers get a new entry
+            key = hashlib.sha256("\n".join(sorted(capabilities)).encode()).hexdigest()
+            self.path = os.path.join(cache_dir, "yang-library-" + key + ".json")
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.library = json.load(f)
+        except (OSError, ValueError):
+            self.library = None
+
+    def store(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".{}.tmp".format(os.getpid())
+
+        with open(tmp_path, "w") as f:
+            json.dump(self.library, f)
+        os.replace(tmp_path, self.path)
+
+    def fetch_library(self):
+        if self.library is not None:
+            return self.library
+
+        try:
+            reply = self.conn.get(filter=library_filter)
+            self.library = parse_library(reply.xml.encode())
+        except (RPCError, transport.RPCFailed):
+            # servers without a yang library only advertise modules in their hello. The
+            # error may also be temporary, so it is not cached and the next run asks again
+            self.library = {}
+            return self.library
+
+        if self.path is not None:
+            self.store()
+
+        return self.library
+
+    def module_features(self, name, version):
+        if version == "1.0" and name in self.modules:
+            return self.modules[name]
+
+        library = self.fetch_library()
+        if name in library:
+            return library[name]
+
+        return self.modules.get(name)
+
+    def module_names(self):
+        return set(self.modules) | set(self.fetch_library())
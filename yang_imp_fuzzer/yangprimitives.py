@@ -19,53 +19,117 @@
 # along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
 #
 
+import base64
 import boofuzz
-import random
+import decimal
 import libyang
 import string
-import re
-import rstr
+from yang_imp_fuzzer import randomstream
+from yang_imp_fuzzer import restrictions
+from yang_imp_fuzzer import xsdregex
+
+# Every primitive draws its values from its own counter based stream, derived from the
+# run seed (or its own seed) and its schema path, so that mutation i can be regenerated
+# from (seed, path, i) without replaying the mutations before it.
+class Primitive(boofuzz.Fuzzable):
+    def stream_key(self):
+        seed = self.seed if self.seed is not None else randomstream.run_seed
+        return randomstream.stream_key(seed, self.path if self.path is not None else self.qualified_name)
+
+    def default_rng(self):
+        # defaults do not depend on the run seed, so cached fuzz trees stay valid across runs
+        seed = self.seed if self.seed is not None else 0
+        return randomstream.at(randomstream.stream_key(seed, self.path), 0)
+
+    def valid_value(self, rng):
+        # the default is rendered in every case that does not mutate the leaf, so unlike
+        # the mutations it is never a boundary or a value outside the restrictions
+        return self.random_value(rng)
+
+    def domain_size(self):
+        # number of distinct valid values, None if there are too many to count
+        return None
+
+    def key_value(self, index, key):
+        # the index-th value of a sequence of valid values, used for the keys of list
+        # entries; values below domain_size() are distinct if that is not None
+        return self.valid_value(randomstream.at(key, index))
+
+    def mutation_count(self):
+        return self.max_mutations
+
+    def mutation(self, index, key=None):
+        if index == 0:
+            return self.original_value()
+        if key is None:
+            key = self.stream_key()
+
+        return self.random_value(randomstream.at(key, index))
+
+    def accepts(self, value):
+        # whether value is valid for the type, None if the primitive can not tell
+        return None
 
-class Enum(boofuzz.Fuzzable):
+    def mutations(self, default_value):
+        key = self.stream_key()
+
+        yield default_value
+        for i in range(1, self.mutation_count()):
+            yield self.mutation(i, key)
+
+class Enum(Primitive):
     def __init__(self,
             name=None,
             enum_vals=[""],
             default_value=None,
             max_mutations=1000,
             seed=None,
+            path=None,
             *args,
             **kwargs
     ):
         self.enum_vals = enum_vals
         self.max_mutations = max_mutations
         self.seed = seed
+        self.path = path if path is not None else name
         self.default_value = default_value
         if default_value is None:
-            self.default_value = random.choice(enum_vals)
+            self.default_value = self.valid_value(self.default_rng())
 
         super(Enum, self).__init__(name=name, default_value=str(self.default_value), *args, **kwargs)
 
-    def mutations(self, default_value):
-        last_val = None
-        if self.seed is not None:
-            random.seed(self.seed)
+    def random_value(self, rng):
+        return rng.choice(self.enum_vals)
 
-        for i in range(self.max_mutations):
-            if i == 0:
-                current_val = default_value
-            else:
-                current_val = random.choice(self.enum_vals)
+    def others(self):
+        return [v for v in self.enum_vals if v != self.default_value]
 
-            if last_val == current_val:
-                continue
+    def mutation_count(self):
+        # every value is sent once
+        return min(self.max_mutations, 1 + len(self.others()))
+
+    def mutation(self, index, key=None):
+        if index == 0:
+            return self.original_value()
+        if key is None:
+            key = self.stream_key()
+
+        others = self.others()
+        return others[randomstream.Permutation(key, len(others)).at(index - 1)]
 
-            last_val = current_val
-            yield current_val
+    def domain_size(self):
+        return len(self.enum_vals)
+
+    def key_value(self, index, key):
+        return self.enum_vals[index]
+
+    def accepts(self, value):
+        return value in self.enum_vals
 
     def encode (self, value, mutation_context=None):
         return value.encode()
 
-class Int(boofuzz.Fuzzable):
+class Int(Primitive):
     def __init__(
             self,
             name=None,
@@ -74,38 +138,84 @@ class Int(boofuzz.Fuzzable):
             max_val=1,
             max_mutations=1000,
             seed=None,
+            path=None,
+            ranges=None,
             *args,
             **kwargs
     ):
-        self.min_val = min_val
-        self.max_val = max_val
+        # min_val and max_val are the bounds of the type when a range restriction is given
+        self.intervals = restrictions.get_intervals(ranges or "min..max", min_val, max_val)
+        self.type_min = min_val
+        self.type_max = max_val
+        self.min_val = self.intervals.min
+        self.max_val = self.intervals.max
         self.max_mutations = max_mutations
         self.seed = seed
+        self.path = path if path is not None else name
         self.default_value = default_value
         if default_value is None:
-            self.default_value = random.randint(self.min_val, self.max_val)
-
-        super(Int, self).__init__(name=name, default_value=str(self.default_value), *args, **kwargs)
-
-
-    def mutations(self, default_value):
-        last_val = None
-        if self.seed is not None:
-            random.seed(self.seed)
-        
-        for i in range(self.max_mutations):
-            if i == 0:
-                current_val = default_value
-            else:
-                current_val = random.randint(self.min_val, self.max_val)
+            self.default_value = self.valid_value(self.default_rng())
 
-            current_val = str(current_val)
+        self.plan_boundaries()
 
-            if last_val == current_val:
-                continue
+        super(Int, self).__init__(name=name, default_value=str(self.default_value), *args, **kwargs)
 
-            last_val = current_val
-            yield current_val
+    def plan_boundaries(self):
+        # Mutations after the default are the boundary values, then the rest of the
+        # domain in the order of a keyed permutation, so no value is sent twice and
+        # small domains are exhausted after every value was sent once.
+        candidates = []
+        for lo, hi in self.intervals.intervals:
+            candidates.extend([lo, hi, lo + 1, hi - 1, lo - 1, hi + 1])
+        candidates.extend([0, self.type_min, self.type_max, self.type_min - 1, self.type_max + 1])
+
+        default = int(self.default_value)
+        self.boundaries = []
+        for v in candidates:
+            if v != default and v not in self.boundaries:
+                self.boundaries.append(v)
+
+        # offsets in the domain that the permutation has to skip
+        self.taken = sorted(self.intervals.offset_of(v) for v in self.boundaries + [default] if v in self.intervals)
+        self.remaining = self.intervals.total - len(self.taken)
+
+    def mutation_count(self):
+        return min(self.max_mutations, 1 + len(self.boundaries) + self.remaining)
+
+    def mutation(self, index, key=None):
+        if index == 0:
+            return self.original_value()
+        if index <= len(self.boundaries):
+            return str(self.boundaries[index - 1])
+        if key is None:
+            key = self.stream_key()
+
+        offset = randomstream.Permutation(key, self.remaining).at(index - 1 - len(self.boundaries))
+        # the offset-th value that is not taken yet
+        for taken in self.taken:
+            if taken > offset:
+                break
+            offset += 1
+
+        return str(self.intervals.value_at(offset))
+
+    def random_value(self, rng):
+        return str(self.intervals.random_value(rng))
+
+    def valid_value(self, rng):
+        return str(self.intervals.uniform(rng))
+
+    def domain_size(self):
+        return self.intervals.total
+
+    def key_value(self, index, key):
+        return str(self.intervals.value_at(randomstream.Permutation(key, self.intervals.total).at(index)))
+
+    def accepts(self, value):
+        try:
+            return int(value) in self.intervals
+        except ValueError:
+            return False
 
     def encode (self, value, mutation_context=None):
         return value.encode()
@@ -246,7 +356,12 @@ class Int64(Int):
         super(Int64, self).__init__(name=name, default_value=default_value, min_val=min_val, max_val=max_val,
                 max_mutations=max_mutations, seed=seed, *args, **kwargs)
 
-class String(boofuzz.Fuzzable):
+class String(Primitive):
+    # attempts to find a value that satisfies every pattern
+    pattern_attempts = 10
+    # characters of values without a pattern
+    alphabet = string.ascii_uppercase + string.digits + string.ascii_lowercase
+
     def __init__(
             self,
             name=None,
@@ -256,58 +371,82 @@ class String(boofuzz.Fuzzable):
             patterns=None,
             max_mutations=1000,
             seed=None,
+            path=None,
+            lengths=None,
             *args,
             **kwargs
     ):
-        self.min_val = int(min_val)
-        self.max_val = int(max_val)
+        # without a length restriction, lengths are drawn from min_val..max_val, and
+        # max_val stands in for "max" if there is one
+        if lengths is None:
+            self.lengths = restrictions.get_intervals("min..max", int(min_val), int(max_val))
+            self.valid_lengths = None
+        else:
+            self.lengths = restrictions.get_intervals(lengths, 0, int(max_val))
+            self.valid_lengths = self.lengths
+        self.min_val = self.lengths.min
+        self.max_val = self.lengths.max
         self.max_mutations = max_mutations
         self.seed = seed
-        self.patterns = patterns
+        self.path = path if path is not None else name
+
+        # all patterns have to match, except the invert-match ones that must not
+        self.patterns = patterns or []
+        self.matching = [xsdregex.compile_pattern(p) for p, invert in self.patterns if not invert]
+        self.inverted = [xsdregex.compile_pattern(p) for p, invert in self.patterns if invert]
 
         self.default_value = default_value
         if default_value is None:
-            if patterns:
-                pattern = r'{}'.format(patterns[0])
-                pattern = pattern.replace("\\p{L}", "[a-zA-z]")
-                pattern = pattern.replace("\\p{N}", "\d")
-                self.default_value = rstr.xeger(pattern)
-                
-                while len(self.default_value) < self.min_val or len(self.default_value) > self.max_val or not re.match(pattern, self.default_value):
-                    self.default_value = rstr.xeger(pattern)
-            else:
-                str_len = random.randint(self.min_val, self.max_val)
-                self.default_value= ''.join(random.choices(string.ascii_uppercase + string.digits + string.ascii_lowercase, k=str_len))
+            self.default_value = self.valid_value(self.default_rng())
 
         super(String, self).__init__(name=name, default_value=self.default_value, *args, **kwargs)
 
-
-
-    def mutations(self, default_value):
-        last_val = None
-        if self.seed is not None:
-            random.seed(self.seed)
-
-        for i in range(self.max_mutations):
-            if i == 0:
-                current_val = default_value
+    def valid(self, value):
+        return all(p.match(value) for p in self.matching[1:]) and not any(p.match(value) for p in self.inverted)
+
+    def accepts(self, value):
+        if self.valid_lengths is not None and len(value) not in self.valid_lengths:
+            return False
+        return (not self.matching or self.matching[0].match(value)) and self.valid(value)
+
+    def random_value(self, rng):
+        return self.generate(self.lengths.random_value(rng), rng)
+
+    def valid_value(self, rng):
+        return self.generate(self.lengths.uniform(rng), rng)
+
+    def domain_size(self):
+        # short values without patterns, longer ones are not exhausted
+        if self.patterns or self.lengths.max > 2:
+            return None
+        return sum(len(String.alphabet) ** n for lo, hi in self.lengths.intervals for n in range(lo, hi + 1))
+
+    def key_value(self, index, key):
+        size = self.domain_size()
+        if size is None:
+            return Primitive.key_value(self, index, key)
+
+        # the values of each length in turn, as numbers in the base of the alphabet
+        index = randomstream.Permutation(key, size).at(index)
+        base = len(String.alphabet)
+        for lo, hi in self.lengths.intervals:
+            for n in range(lo, hi + 1):
+                if index < base ** n:
+                    return "".join(String.alphabet[index // base ** i % base] for i in range(n))
+                index -= base ** n
+
+    def generate(self, length, rng):
+        value = ""
+
+        for _ in range(self.pattern_attempts):
+            if self.matching:
+                value = self.matching[0].generate(length, length, rng)
             else:
-                if self.patterns:
-                    pattern = r'{}'.format(self.patterns[0])
-                    pattern = pattern.replace("\\p{L}", "[a-zA-z]")
-                    pattern = pattern.replace("\\p{N}", "\d")
-                    current_val = rstr.xeger(pattern)
-                    while len(current_val) < self.min_val or len(current_val) > self.max_val or not re.match(pattern, current_val):
-                        current_val = rstr.xeger(pattern)
-                else:
-                    str_len = random.randint(self.min_val, self.max_val)
-                    current_val = ''.join(random.choices(string.ascii_uppercase + string.digits + string.ascii_lowercase, k=str_len))
+                value = ''.join(rng.choices(String.alphabet, k=length))
+            if self.valid(value):
+                break
 
-            if last_val == current_val:
-                continue
-
-            last_val = current_val
-            yield current_val
+        return value
 
     def encode (self, value, mutation_context=None):
         return value.encode()
@@ -444,31 +583,534 @@ class UInt64(Int):
         super(UInt64, self).__init__(name=name, default_value=default_value, min_val=min_val, max_val=max_val,
                 max_mutations=max_mutations, seed=seed, *args, **kwargs)
 
-class Union(boofuzz.Fuzzable):
+class Boolean(Enum):
+    def __init__(self, name=None, default_value=None, max_mutations=1000, seed=None, path=None, *args, **kwargs):
+        super(Boolean, self).__init__(name=name, enum_vals=["true", "false"], default_value=default_value,
+                max_mutations=max_mutations, seed=seed, path=path, *args, **kwargs)
+
+class Identityref(Enum):
+    def __init__(self, name=None, enum_vals=[""], namespaces={}, *args, **kwargs):
+        # values are prefixed with module names, declared on the start tag of the leaf
+        self.namespaces = namespaces
+        super(Identityref, self).__init__(name=name, enum_vals=enum_vals, *args, **kwargs)
+
+class InstanceIdentifier(Enum):
+    def __init__(self, name=None, enum_vals=[""], namespaces={}, *args, **kwargs):
+        self.namespaces = namespaces
+        super(InstanceIdentifier, self).__init__(name=name, enum_vals=enum_vals, *args, **kwargs)
+
+    def random_value(self, rng):
+        # list keys are filled with the same short token
+        key = "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(1, 8)))
+        return rng.choice(self.enum_vals).replace("%s", key)
+
+    def mutation_count(self):
+        # the key values are random, so the paths are not exhausted
+        return self.max_mutations
+
+    def domain_size(self):
+        return None
+
+    def key_value(self, index, key):
+        return Primitive.key_value(self, index, key)
+
+    def mutation(self, index, key=None):
+        return Primitive.mutation(self, index, key)
+
+class Leafref(Primitive):
+    # how many distinct valid values of the target are used, found among its first mutations
+    target_values = 16
+    target_scan = 256
+
+    def __init__(self, name=None, target=None, max_mutations=1000, seed=None, path=None, *args, **kwargs):
+        self.target = target
+        self.max_mutations = max_mutations
+        self.seed = seed
+        self.path = path if path is not None else name
+        self.key = None
+        self.values = []
+        self.default_value = target.original_value()
+
+        super(Leafref, self).__init__(name=name, default_value=self.default_value, *args, **kwargs)
+
+    def target_values_list(self):
+        # the target is built with the schema path of the target leaf, so these are values
+        # that the target leaf itself is fuzzed with, without the ones it does not accept
+        if not isinstance(self.target, Primitive):
+            return [self.target.original_value()]
+
+        key = self.target.stream_key()
+        if key != self.key:
+            self.key = key
+            self.values = [self.target.original_value()]
+            for i in range(1, min(self.target_scan, self.target.mutation_count())):
+                if len(self.values) >= self.target_values:
+                    break
+                value = self.target.mutation(i, key)
+                if value not in self.values and self.target.accepts(value) is not False:
+                    self.values.append(value)
+        return self.values
+
+    def mutation_count(self):
+        # every value is sent once
+        return min(self.max_mutations, len(self.target_values_list()))
+
+    def mutation(self, index, key=None):
+        if index == 0:
+            return self.original_value()
+        return self.target_values_list()[index]
+
+    def random_value(self, rng):
+        return rng.choice(self.target_values_list())
+
+    def domain_size(self):
+        return self.target.domain_size() if isinstance(self.target, Primitive) else 1
+
+    def key_value(self, index, key):
+        if not isinstance(self.target, Primitive):
+            return self.target.original_value()
+        return self.target.key_value(index, key)
+
+    def encode (self, value, mutation_context=None):
+        return value.encode()
+
+class Decimal64(Primitive):
+    dec64_max = 2 ** 63 - 1
+    dec64_min = -2 ** 63
+
+    def __init__(
+            self,
+            name=None,
+            default_value=None,
+            min_val="min",
+            max_val="max",
+            fraction_digits=1,
+            max_mutations=1000,
+            seed=None,
+            path=None,
+            ranges=None,
+            *args,
+            **kwargs
+    ):
+        self.fraction_digits = int(fraction_digits)
+        if ranges is None:
+            ranges = "{}..{}".format(min_val, max_val)
+        # values are kept as integers in units of the last fraction digit
+        self.intervals = restrictions.get_intervals(ranges, Decimal64.dec64_min, Decimal64.dec64_max, self.fraction_digits)
+
+        if self.intervals.min < Decimal64.dec64_min:
+            raise ValueError("min value too low for decimal64 type")
+        if self.intervals.max > Decimal64.dec64_max:
+            raise ValueError("max value too big for decimal64 type")
+
+        self.max_mutations = max_mutations
+        self.seed = seed
+        self.path = path if path is not None else name
+        self.default_value = default_value
+        if default_value is None:
+            self.default_value = self.valid_value(self.default_rng())
+
+        super(Decimal64, self).__init__(name=name, default_value=str(self.default_value), *args, **kwargs)
+
+    def random_value(self, rng):
+        return self.format(self.intervals.random_value(rng))
+
+    def valid_value(self, rng):
+        return self.format(self.intervals.uniform(rng))
+
+    def domain_size(self):
+        return self.intervals.total
+
+    def key_value(self, index, key):
+        return self.format(self.intervals.value_at(randomstream.Permutation(key, self.intervals.total).at(index)))
+
+    def format(self, value):
+        integer, fraction = divmod(abs(value), 10 ** self.fraction_digits)
+        return "{}{}.{:0{}d}".format("-" if value < 0 else "", integer, fraction, self.fraction_digits)
+
+    def accepts(self, value):
+        try:
+            value = decimal.Decimal(value) * 10 ** self.fraction_digits
+        except decimal.InvalidOperation:
+            return False
+        return value == value.to_integral_value() and int(value) in self.intervals
+
+    def encode (self, value, mutation_context=None):
+        return value.encode()
+
+class Bits(Primitive):
+    def __init__(self, name=None, bit_names=[], default_value=None, max_mutations=1000, seed=None, path=None, *args, **kwargs):
+        self.bit_names = bit_names
+        self.max_mutations = max_mutations
+        self.seed = seed
+        self.path = path if path is not None else name
+        self.default_value = default_value
+        if default_value is None:
+            self.default_value = self.valid_value(self.default_rng())
+
+        super(Bits, self).__init__(name=name, default_value=self.default_value, *args, **kwargs)
+
+    def random_value(self, rng):
+        mask = rng.getrandbits(len(self.bit_names))
+        return self.format(mask)
+
+    def format(self, mask):
+        return " ".join(b for i, b in enumerate(self.bit_names) if mask >> i & 1)
+
+    def domain_size(self):
+        return 2 ** len(self.bit_names)
+
+    def key_value(self, index, key):
+        return self.format(randomstream.Permutation(key, 2 ** len(self.bit_names)).at(index))
+
+    def accepts(self, value):
+        return all(b in self.bit_names for b in value.split())
+
+    def encode (self, value, mutation_context=None):
+        return value.encode()
+
+class Binary(Primitive):
+    # upper bound of the decoded length if the type has none
+    max_len = 256
+
+    def __init__(self, name=None, default_value=None, min_val=0, max_val=max_len, max_mutations=1000, seed=None, path=None, lengths=None, *args, **kwargs):
+        if lengths is None:
+            self.lengths = restrictions.get_intervals("min..max", int(min_val), int(max_val))
+        else:
+            self.lengths = restrictions.get_intervals(lengths, 0, int(max_val))
+        self.max_mutations = max_mutations
+        self.seed = seed
+        self.path = path if path is not None else name
+        self.default_value = default_value
+        if default_value is None:
+            self.default_value = self.valid_value(self.default_rng())
+
+        super(Binary, self).__init__(name=name, default_value=self.default_value, *args, **kwargs)
+
+    def random_value(self, rng):
+        return self.generate(self.lengths.random_value(rng), rng)
+
+    def valid_value(self, rng):
+        return self.generate(self.lengths.uniform(rng), rng)
+
+    def domain_size(self):
+        if self.lengths.max > 2:
+            return None
+        return sum(256 ** n for lo, hi in self.lengths.intervals for n in range(lo, hi + 1))
+
+    def key_value(self, index, key):
+        size = self.domain_size()
+        if size is None:
+            return Primitive.key_value(self, index, key)
+
+        # the values of each length in turn, as little endian numbers
+        index = randomstream.Permutation(key, size).at(index)
+        for lo, hi in self.lengths.intervals:
+            for n in range(lo, hi + 1):
+                if index < 256 ** n:
+                    return base64.b64encode(index.to_bytes(n, "little")).decode()
+                index -= 256 ** n
+
+    def generate(self, n, rng):
+        # the length restriction applies to the decoded octets
+        return base64.b64encode(rng.getrandbits(8 * n).to_bytes(n, "little")).decode()
+
+    def encode (self, value, mutation_context=None):
+        return value.encode()
+
+class Union(Primitive):
+    # every distinct_every-th mutation is a value that only one member type accepts
+    distinct_every = 4
+    distinct_attempts = 8
+
     def __init__(
         self,
         name=None,
         seed=None,
         children=[],
+        path=None,
+        max_mutations=1000,
         *args,
         **kwargs
     ):
 
         self.children = children
-        child = random.choice(self.children)
+        self.seed = seed
+        self.path = path if path is not None else name
+        self.max_mutations = max_mutations
+        self.enum_values = None
+        child = self.default_rng().choice(self.children)
         self.default_value = child.default_value
         super(Union, self).__init__(name=name, default_value=self.default_value, *args, **kwargs)
 
-    def mutations(self, default_value):
-        child = random.choice(self.children)
-        return child.mutations(child.default_value)
+    def child_counts(self):
+        return [c.mutation_count() if isinstance(c, Primitive) else 1 for c in self.children]
+
+    def mutation_count(self):
+        # the mutations of all members, and the distinct values in between
+        total = sum(self.child_counts())
+        return min(self.max_mutations, 1 + total + total // (self.distinct_every - 1))
+
+    def child_mutation(self, index):
+        # round robin over the members, members that are exhausted drop out
+        counts = self.child_counts()
+        done = 0
+
+        for level in sorted(set(counts)):
+            alive = [i for i, count in enumerate(counts) if count > done]
+            span = (level - done) * len(alive)
+            if index < span:
+                return self.children[alive[index % len(alive)]], done + index // len(alive)
+            index -= span
+            done = level
+
+        return None, None
+
+    def accepts(self, value):
+        return any(isinstance(c, Primitive) and c.accepts(value) for c in self.children)
+
+    def domain_sizes(self):
+        return [c.domain_size() if isinstance(c, Primitive) else 1 for c in self.children]
+
+    def domain_size(self):
+        # values that several members accept are counted more than once
+        sizes = self.domain_sizes()
+        return None if None in sizes else sum(sizes)
+
+    def key_value(self, index, key):
+        sizes = self.domain_sizes()
+        if None in sizes:
+            # round robin over the members, the countable ones start over when they are done
+            member, index = index % len(sizes), index // len(sizes)
+            child = self.children[member]
+            if sizes[member] is not None:
+                index %= sizes[member]
+        else:
+            # the values of each member in turn
+            for child, size in zip(self.children, sizes):
+                if index < size:
+                    break
+                index -= size
+        if not isinstance(child, Primitive):
+            return child.original_value()
+        return child.key_value(index, key)
+
+    def mutation(self, index, key=None):
+        if index == 0:
+            return self.original_value()
+
+        child = None
+        if index % self.distinct_every != 0:
+            child, child_index = self.child_mutation(index - 1 - index // self.distinct_every)
+        if child is not None:
+            if not isinstance(child, Primitive):
+                return child.original_value()
+            return child.mutation(child_index)
+
+        slot = index // self.distinct_every - 1
+        enum_values = self.distinct_enum_values()
+        if slot < len(enum_values):
+            return enum_values[slot]
+
+        return self.distinct_value(randomstream.at(key if key is not None else self.stream_key(), index))
+
+    def distinct_enum_values(self):
+        # the values of the enumerated members that no other member accepts, each sent once
+        if self.enum_values is None:
+            members = [c for c in self.children if isinstance(c, Primitive)]
+            self.enum_values = []
+            for child in members:
+                if not isinstance(child, Enum) or isinstance(child, InstanceIdentifier):
+                    continue
+                others = [c for c in members if c is not child]
+                for value in child.enum_vals:
+                    if value not in self.enum_values and not any(c.accepts(value) for c in others):
+                        self.enum_values.append(value)
+        return self.enum_values
+
+    def distinct_value(self, rng):
+        # a value that another member accepts as well does not tell whether the server
+        # picked the right member
+        members = [c for c in self.children if isinstance(c, Primitive)]
+        if not members:
+            return self.original_value()
+
+        # the enumerated members are done after distinct_enum_values(), unless there are
+        # only those
+        random_members = [c for c in members if not isinstance(c, Enum) or isinstance(c, InstanceIdentifier)]
+        child = rng.choice(random_members or members)
+        others = [c for c in members if c is not child]
+        value = child.random_value(rng)
+        for _ in range(self.distinct_attempts):
+            if not any(c.accepts(value) for c in others):
+                break
+            value = child.random_value(rng)
+
+        return value
+
+    def random_value(self, rng):
+        child = rng.choice(self.children)
+        if not isinstance(child, Primitive):
+            return child.original_value()
+        return child.random_value(rng)
+
+    @property
+    def namespaces(self):
+        res = {}
+        for c in self.children:
+            res.update(getattr(c, "namespaces", {}))
+        return res
 
     def encode (self, value, mutation_context=None):
         return value.encode()
 
+# Extra entries of a list, rendered after the entry of the fuzz tree. A mutation is a
+# number of entries with unique keys, growing geometrically up to max_entries, around
+# min-elements and max-elements, or a copy of the entry of the fuzz tree. Numbers of
+# entries that need more keys than the key types have are left out. The entries are
+# rendered in chunks, so the transport can send them without joining them first.
+class ListEntries(Primitive):
+    chunk_entries = 256
+    # key values in a row that are taken already before no more entries are generated
+    key_attempts = 1000
+
+    def __init__(
+            self,
+            name=None,
+            start=b"",
+            end=b"",
+            keys=[],
+            body=b"",
+            min_elements=0,
+            max_elements=None,
+            max_entries=4096,
+            seed=None,
+            path=None,
+            *args,
+            **kwargs
+    ):
+        # keys are (start tag, primitive, end tag) of the key leaves, body is the rest of
+        # an entry, the mandatory leaves with their default values
+        self.start = start
+        self.end = end
+        self.keys = keys
+        self.body = body
+        self.seed = seed
+        self.path = path if path is not None else name
+
+        counts = set()
+        n = 2
+        while n <= max_entries:
+            counts.add(n)
+            n *= 2
+        for bound in [min_elements, max_elements]:
+            if bound:
+                counts.update([bound - 1, bound, bound + 1])
+
+        # the entry of the fuzz tree has one of the key values
+        domain = self.domain_size()
+        if domain is not None:
+            counts = {n for n in counts if n <= domain}
+
+        self.values = ["entries {}".format(n) for n in sorted(counts) if n >= 2] + ["duplicate"]
+        self.max_mutations = 1 + len(self.values)
+        super(ListEntries, self).__init__(name=name, default_value="", *args, **kwargs)
+
+    def mutation(self, index, key=None):
+        if index == 0:
+            return self.original_value()
+        return self.values[index - 1]
+
+    def random_value(self, rng):
+        return rng.choice(self.values)
+
+    def entry(self, values):
+        res = [self.start]
+        for (start, primitive, end), value in zip(self.keys, values):
+            res.extend([start, primitive.encode(value, None), end])
+        res.extend([self.body, self.end])
+        return b"".join(res)
+
+    def key_sizes(self):
+        return [p.domain_size() if isinstance(p, Primitive) else 1 for _, p, _ in self.keys]
+
+    def domain_size(self):
+        # number of distinct combinations of key values
+        size = 1
+        for n in self.key_sizes():
+            if n is None:
+                return None
+            size *= n
+        return size
+
+    def iter_keys(self):
+        # unique and valid key values: the keys with a countable domain go through all
+        # their combinations, the first key varying fastest, and the other keys take the
+        # next value of their sequence for every entry
+        primitives = [p for _, p, _ in self.keys]
+        sizes = self.key_sizes()
+        stream_keys = [p.stream_key() if isinstance(p, Primitive) else None for p in primitives]
+        seen = {tuple(p.original_value() for p in primitives)}
+        domain = self.domain_size()
+
+        i = 0
+        misses = 0
+        while (domain is None or i < domain) and misses < self.key_attempts:
+            values = []
+            rest = i
+            for p, size, stream_key in zip(primitives, sizes, stream_keys):
+                if not isinstance(p, Primitive):
+                    values.append(p.original_value())
+                elif size is None:
+                    values.append(p.key_value(i, stream_key))
+                else:
+                    rest, j = divmod(rest, size)
+                    values.append(p.key_value(j, stream_key))
+            i += 1
+
+            values = tuple(values)
+            if values in seen or any(isinstance(p, Primitive) and p.accepts(v) is False for p, v in zip(primitives, values)):
+                misses += 1
+                continue
+            misses = 0
+            seen.add(values)
+            yield values
+
+    def encode_chunks(self, value):
+        if not value:
+            return
+        if value == "duplicate":
+            yield self.entry([p.original_value() for _, p, _ in self.keys])
+            return
+
+        # the entry of the fuzz tree is one of the n entries
+        n = int(value.split()[1]) - 1
+        chunk = []
+        for values in self.iter_keys():
+            if n <= 0:
+                break
+            chunk.append(self.entry(values))
+            n -= 1
+            if len(chunk) >= self.chunk_entries:
+                yield b"".join(chunk)
+                chunk = []
+
+        if chunk:
+            yield b"".join(chunk)
+
+    def encode (self, value, mutation_context=None):
+        return b"".join(self.encode_chunks(value))
+
 yang_boofuzz_map = {
+            libyang.Type.BINARY: Binary,
+            libyang.Type.BITS: Bits,
+            libyang.Type.BOOL: Boolean,
+            libyang.Type.DEC64: Decimal64,
             libyang.Type.EMPTY: boofuzz.Static,
             libyang.Type.ENUM: Enum,
+            libyang.Type.IDENT: Identityref,
+            libyang.Type.INST: InstanceIdentifier,
+            libyang.Type.LEAFREF: Leafref,
             libyang.Type.INT8: Int8,
             libyang.Type.INT16: Int16,
             libyang.Type.INT32: Int32,
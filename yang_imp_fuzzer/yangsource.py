@@ -0,0 +1,450 @@
+#
+# telekom / yang-imp-fuzzer
+#
+# Copyright (c) 2021 Deutsche Telekom AG
+#
+# Deutsche Telekom AG and all other contributors / copyright
+# owners license this file to you under the terms of the GPL-2.0:
+#
+# yang-imp-fuzzer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License, version 2.0, as published by
+# the Free Software Foundation.
+#
+# yang-imp-fuzzer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with yang-imp-fuzzer. If not, see <https://www.gnu.org/licenses/
+#
+
+import collections
+import glob
+import os
+import re
+
+# libyang-python 1.x does not expose fraction-digits, identities, leafref paths or the
+# element counts of lists, so they are read from the module sources. The statements of
+# every module loaded in a context are indexed once and kept on the context.
+
+token_re = re.compile(r'''
+      (?P<space>\s+)
+    | (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<dquoted>"(?:[^"\\]|\\.)*")
+    | (?P<squoted>'[^']*')
+    | (?P<special>[{};])
+    | (?P<word>[^\s{};"']+)
+''', re.DOTALL | re.VERBOSE)
+
+predicate_re = re.compile(r"\[[^\]]*\]")
+
+builtin_types = frozenset([
+    "binary", "bits", "boolean", "decimal64", "empty", "enumeration", "identityref",
+    "instance-identifier", "int8", "int16", "int32", "int64", "leafref", "string",
+    "uint8", "uint16", "uint32", "uint64", "union",
+])
+
+data_keywords = frozenset(["container", "list", "leaf", "leaf-list", "anydata", "anyxml"])
+
+Statement = collections.namedtuple("Statement", ["keyword", "arg", "children"])
+
+def tokenize(text):
+    for m in token_re.finditer(text):
+        kind = m.lastgroup
+        value = m.group()
+        if kind == "dquoted":
+            yield value[1:-1].replace('\\"', '"').replace("\\\\", "\\"), True
+        elif kind == "squoted":
+            yield value[1:-1], True
+        elif kind in ["special", "word"]:
+            yield value, False
+
+def parse_statements(text):
+    root = []
+    stack = [root]
+    words = []
+    concat = False
+
+    for token, quoted in tokenize(text):
+        if not quoted and token in "{};":
+            if token == "}":
+                if len(stack) > 1:
+                    stack.pop()
+                words = []
+                continue
+
+            if words:
+                stmt = Statement(words[0], words[1] if len(words) > 1 else None, [])
+                stack[-1].append(stmt)
+                if token == "{":
+                    stack.append(stmt.children)
+            words = []
+        elif not quoted and token == "+" and len(words) > 1:
+            concat = True
+        elif concat:
+            words[-1] += token
+            concat = False
+        else:
+            words.append(token)
+
+    return root
+
+def substatement(stmt, keyword):
+    for c in stmt.children:
+        if c.keyword == keyword:
+            return c.arg
+    return None
+
+def walk(stmts):
+    for stmt in stmts:
+        yield stmt
+        yield from walk(stmt.children)
+
+def split_data_path(path):
+    # (module, name) of every segment, a segment only names its module where it changes
+    segments = []
+    module = None
+    for segment in predicate_re.sub("", path).strip("/").split("/"):
+        if ":" in segment:
+            module, segment = segment.split(":", 1)
+        segments.append((module, segment))
+    return tuple(segments)
+
+class ModuleInfo:
+    def __init__(self, stmt):
+        self.name = stmt.arg
+        self.namespace = substatement(stmt, "namespace")
+        self.prefixes = {}
+
+        if stmt.keyword == "submodule":
+            for c in stmt.children:
+                if c.keyword == "belongs-to":
+                    self.name = c.arg
+                    self.prefixes[substatement(c, "prefix")] = c.arg
+        else:
+            self.prefixes[substatement(stmt, "prefix")] = self.name
+
+        for c in stmt.children:
+            if c.keyword == "import":
+                self.prefixes[substatement(c, "prefix")] = c.arg
+
+    def resolve(self, qname):
+        if ":" not in qname:
+            return self.name, qname
+        prefix, name = qname.split(":", 1)
+        return self.prefixes.get(prefix, prefix), name
+
+class SourceIndex:
+    def __init__(self):
+        self.files = set()
+        self.modules = {}
+        self.namespaces = {}
+        self.identities = {}
+        self.typedefs = {}
+        self.leaves = collections.defaultdict(list)
+        self.lists = collections.defaultdict(list)
+        self.sources = []
+        self.groupings = {}
+        self.derived = None
+        self.paths = None
+        self.schema_ids = None
+
+    def update(self, ctx):
+        for module in ctx:
+            path = module.filepath()
+            if path and path not in self.files:
+                self.add_file(path)
+
+    def add_file(self, path):
+        self.files.add(path)
+        try:
+            with open(path) as f:
+                stmts = parse_statements(f.read())
+        except OSError:
+            return
+
+        for stmt in stmts:
+            if stmt.keyword not in ["module", "submodule"]:
+                continue
+
+            info = ModuleInfo(stmt)
+            if stmt.keyword == "module":
+                self.modules[info.name] = info
+                self.namespaces[info.name] = info.namespace
+            self.add_statements(info, stmt.children)
+            self.sources.append((info, stmt.children))
+            self.paths = None
+
+            # submodules are looked up next to the module that includes them
+            for c in stmt.children:
+                if c.keyword == "include":
+                    pattern = os.path.join(os.path.dirname(path), glob.escape(c.arg))
+                    for sub in sorted(glob.glob(pattern + ".yang") + glob.glob(pattern + "@*.yang"))[-1:]:
+                        if sub not in self.files:
+                            self.add_file(sub)
+
+    def add_statements(self, info, stmts):
+        # groupings of the top level can be used from other modules and submodules
+        scope = {}
+        for stmt in stmts:
+            if stmt.keyword == "grouping":
+                scope[stmt.arg] = self.groupings[(info.name, stmt.arg)] = (info, stmt, [scope])
+
+        for stmt in walk(stmts):
+            if stmt.keyword == "identity":
+                bases = [info.resolve(c.arg) for c in stmt.children if c.keyword == "base"]
+                self.identities[(info.name, stmt.arg)] = bases
+                self.derived = None
+            elif stmt.keyword == "typedef":
+                type_stmt = self.type_of(stmt)
+                if type_stmt is not None:
+                    self.typedefs[(info.name, stmt.arg)] = (info, type_stmt)
+            elif stmt.keyword in ["leaf", "leaf-list"]:
+                self.leaves[stmt.arg].append((info, stmt))
+            elif stmt.keyword == "list":
+                self.lists[stmt.arg].append((info, stmt))
+
+    def get_paths(self):
+        # The leaf and list statements by the data path of their nodes. Groupings are
+        # expanded where they are used and augments are applied to their targets, so
+        # statements with the same name in one module are told apart.
+        if self.paths is not None:
+            return self.paths
+
+        self.paths = collections.defaultdict(list)
+        self.schema_ids = {}
+        augments = []
+        for info, stmts in self.sources:
+            self.expand(info, stmts, (), (), info.name, [], augments)
+
+        # augments can target the nodes added by other augments
+        while augments:
+            pending = []
+            added = []
+            for augment in augments:
+                info, stmt, ns, schema_id, scopes = augment
+                target = self.augment_target(info, stmt.arg, ns, schema_id)
+                if target not in self.schema_ids:
+                    pending.append(augment)
+                    continue
+                self.expand(info, stmt.children, self.schema_ids[target], target, ns, scopes, added, 1)
+
+            if not added and len(pending) == len(augments):
+                break
+            augments = pending + added
+
+        return self.paths
+
+    def augment_target(self, info, arg, ns, schema_id):
+        # the schema node id of an augment, relative ones are those of uses
+        target = schema_id
+        for segment in (arg or "").strip().strip("/").split("/"):
+            if ":" in segment or not schema_id:
+                target += (info.resolve(segment),)
+            else:
+                target += ((ns, segment),)
+        return target
+
+    def find_grouping(self, info, name, scopes):
+        module, grouping = info.resolve(name)
+        if module == info.name:
+            for scope in scopes:
+                if grouping in scope:
+                    return scope[grouping]
+        return self.groupings.get((module, grouping))
+
+    def expand(self, info, stmts, data_path, schema_id, ns, scopes, augments, depth=0):
+        # ns is the module the nodes belong to, the one where their grouping is used
+        if depth > 64:
+            return
+
+        local = {}
+        scopes = [local] + scopes
+        for stmt in stmts:
+            if stmt.keyword == "grouping":
+                local[stmt.arg] = (info, stmt, scopes)
+
+        for stmt in stmts:
+            if stmt.keyword in data_keywords:
+                path = data_path + ((ns, stmt.arg),)
+                node_id = schema_id + ((ns, stmt.arg),)
+                self.paths[path].append((info, stmt))
+                self.schema_ids[node_id] = path
+                if stmt.keyword in ["container", "list"]:
+                    self.expand(info, stmt.children, path, node_id, ns, scopes, augments, depth + 1)
+            elif stmt.keyword in ["choice", "case"]:
+                # part of the schema node ids of augments, but not of the data path
+                node_id = schema_id + ((ns, stmt.arg),)
+                self.schema_ids[node_id] = data_path
+                self.expand(info, stmt.children, data_path, node_id, ns, scopes, augments, depth + 1)
+            elif stmt.keyword == "uses":
+                grouping = self.find_grouping(info, stmt.arg or "", scopes)
+                if grouping is not None:
+                    g_info, g_stmt, g_scopes = grouping
+                    self.expand(g_info, g_stmt.children, data_path, schema_id, ns, g_scopes, augments, depth + 1)
+                for c in stmt.children:
+                    if c.keyword == "augment":
+                        augments.append((info, c, ns, schema_id, scopes))
+            elif stmt.keyword == "augment" and not schema_id:
+                augments.append((info, stmt, info.name, (), scopes))
+
+    def node_statement(self, node, by_name):
+        entries = self.get_paths().get(split_data_path(node.data_path()))
+        if not entries:
+            # nodes whose groupings or augments could not be resolved are looked up by name
+            entries = by_name.get(node.name(), [])
+
+        # a name that is used for different statements is left to the built-in type
+        if len({id(stmt) for _, stmt in entries}) != 1:
+            return None
+        return entries[0]
+
+    def type_of(self, stmt):
+        for c in stmt.children:
+            if c.keyword == "type":
+                return c
+        return None
+
+    def find_builtin(self, info, type_stmt, basename, depth=0):
+        # follows the typedef chain and the members of unions down to the built-in type
+        if depth > 32 or type_stmt.arg is None:
+            return None
+
+        if type_stmt.arg == basename:
+            return info, type_stmt
+        if type_stmt.arg == "union":
+            for c in type_stmt.children:
+                if c.keyword == "type":
+                    res = self.find_builtin(info, c, basename, depth + 1)
+                    if res is not None:
+                        return res
+            return None
+        if type_stmt.arg in builtin_types:
+            return None
+
+        typedef = self.typedefs.get(info.resolve(type_stmt.arg))
+        if typedef is None:
+            return None
+        return self.find_builtin(typedef[0], typedef[1], basename, depth + 1)
+
+    def type_statement(self, node, node_type):
+        # the statement of the built-in type a leaf or one of its union members is based on
+        basename = node_type.basename()
+        if basename == "instance-id":
+            basename = "instance-identifier"
+
+        if node_type.name() != node_type.basename():
+            try:
+                key = (node_type.module().name(), node_type.name())
+            except Exception:
+                key = None
+            typedef = self.typedefs.get(key)
+            if typedef is not None:
+                res = self.find_builtin(typedef[0], typedef[1], basename)
+                if res is not None:
+                    return res
+
+        entry = self.node_statement(node, self.leaves)
+        if entry is None:
+            return None
+        type_stmt = self.type_of(entry[1])
+        if type_stmt is None:
+            return None
+        return self.find_builtin(entry[0], type_stmt, basename)
+
+    def fraction_digits(self, node, node_type):
+        res = self.type_statement(node, node_type)
+        if res is None:
+            return None
+        digits = substatement(res[1], "fraction-digits")
+        return int(digits) if digits is not None else None
+
+    def derived_identities(self, node, node_type):
+        res = self.type_statement(node, node_type)
+        if res is None:
+            return []
+
+        info, type_stmt = res
+        bases = [info.resolve(c.arg) for c in type_stmt.children if c.keyword == "base"]
+        derived = self.get_derived()
+
+        identities = set()
+        for base in bases:
+            identities.update(derived.get(base, ()))
+        # a base without derived identities is still sent, the server has to reject it
+        return sorted(identities) or sorted(bases)
+
+    def get_derived(self):
+        if self.derived is not None:
+            return self.derived
+
+        ancestors = {}
+
+        def get_ancestors(identity, seen=()):
+            if identity in ancestors:
+                return ancestors[identity]
+            res = set()
+            for base in self.identities.get(identity, []):
+                if base in seen:
+                    continue
+                res.add(base)
+                res.update(get_ancestors(base, seen + (identity,)))
+            ancestors[identity] = res
+            return res
+
+        self.derived = collections.defaultdict(set)
+        for identity in self.identities:
+            for base in get_ancestors(identity):
+                self.derived[base].add(identity)
+
+        return self.derived
+
+    def leafref_path(self, node, node_type):
+        # data path of the leafref target, with module names as prefixes of every segment
+        res = self.type_statement(node, node_type)
+        if res is None:
+            return None
+
+        info, type_stmt = res
+        path = substatement(type_stmt, "path")
+        if path is None:
+            return None
+
+        segments = []
+        path = predicate_re.sub("", path).strip()
+        if not path.startswith("/"):
+            segments = list(split_data_path(node.data_path()))
+
+        for segment in path.strip("/").split("/"):
+            segment = segment.strip()
+            if segment in ["", "."]:
+                continue
+            if segment == "..":
+                if segments:
+                    segments.pop()
+                continue
+            segments.append(info.resolve(segment))
+
+        return "/" + "/".join("{}:{}".format(module, name) for module, name in segments)
+
+    def list_bounds(self, node):
+        # min-elements and max-elements of a list, None stands for unbounded
+        entry = self.node_statement(node, self.lists)
+        if entry is None:
+            return 0, None
+
+        stmt = entry[1]
+        min_elements = substatement(stmt, "min-elements")
+        max_elements = substatement(stmt, "max-elements")
+        return (int(min_elements) if min_elements is not None else 0,
+                int(max_elements) if max_elements not in [None, "unbounded"] else None)
+
+def get_index(ctx):
+    # kept on the context, so modules loaded into a shared context are only parsed once
+    index = getattr(ctx, "yang_source_index", None)
+    if index is None:
+        index = SourceIndex()
+        ctx.yang_source_index = index
+    index.update(ctx)
+    return index